@@ -0,0 +1,435 @@
+"""Benchmarks of terrain generation, rendering and simulation hot paths.
+
+Every case is timed several times, and its minimum, median and mean times
+are reported. Results are written as JSON, and are compared with the
+results of an earlier run to show regressions as ratios.
+
+The reference results in `bench/baseline.json` are compared with by
+default. They were made on a single machine with
+
+    python -m src.bench --no-baseline --output bench/baseline.json
+
+and should be remade the same way when cases change or when comparing on
+another machine. A case regresses if its minimum time exceeds the
+baseline by the ratio `--threshold` and by `--tolerance` milliseconds,
+so that the noise of sub-millisecond cases is not reported.
+
+Rendering runs headless with the SDL dummy video driver unless another
+driver is set in `SDL_VIDEODRIVER`.
+
+Usage:
+    python -m src.bench [--quick] [--filter TEXT] [--repeats N]
+                        [--output PATH] [--baseline PATH | --no-baseline]
+                        [--threshold RATIO] [--tolerance MS]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from src.civ.group import Group
+from src.civ.simulation import Simulation
+from src.field.cell import Cell
+from src.field.config import FieldConfig
+from src.field.field import Field
+from src.field.render import (
+    calc_elev_colors,
+    calc_elev_colors_simple,
+    calc_land_dist_colors,
+    calc_stpn_colors,
+    render_field,
+)
+from src.field.terrain import (
+    calc_elevs,
+    calc_land_dists,
+    calc_stpns,
+    determine_sea_or_land,
+    generate_terrain,
+    label_components,
+)
+
+BENCH_VERSION = 1
+
+BENCH_SCALES = (32, 64, 128)
+BENCH_QUICK_SCALES = (32,)
+BENCH_GROUP_COUNTS = (1_000, 10_000)
+BENCH_QUICK_GROUP_COUNTS = (1_000,)
+BENCH_GROUP_SCALE = 64
+BENCH_N_CROSSINGS = 200
+
+BENCH_TERRAIN_SEED = 9
+BENCH_SIM_SEED = 1
+
+BENCH_REPEATS = 5
+BENCH_THRESHOLD = 1.1
+BENCH_TOLERANCE = 0.5  # ms
+
+BENCH_BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench",
+    "baseline.json")
+
+BENCH_COLOR_FUNCS = (
+    calc_elev_colors,
+    calc_elev_colors_simple,
+    calc_stpn_colors,
+    calc_land_dist_colors,
+)
+
+_fields = {}
+
+
+def measure(run, setup=None, repeats=BENCH_REPEATS):
+    """Times a function several times.
+
+    Args:
+        run (Callable): Function to time. It is called with the values
+            returned by `setup`.
+        setup (Callable[[], tuple] | None): Function called before every
+            run, and not timed. If `None`, `run` is called with no
+            arguments.
+        repeats (int): Number of runs.
+
+    Returns:
+        out (dict[str, float | int]): Minimum, median and mean times (s) and
+            the number of runs.
+    """
+    times = []
+    for _ in range(repeats):
+        args = () if setup is None else setup()
+        time_start = time.perf_counter()
+        run(*args)
+        times.append(time.perf_counter() - time_start)
+    return {
+        "min": min(times),
+        "median": float(np.median(times)),
+        "mean": float(np.mean(times)),
+        "repeats": repeats,
+    }
+
+
+def get_field(scale):
+    """Gets a field with terrain that benchmarks share.
+
+    Terrain is generated with `compat=False` the first time a scale is
+    requested.
+
+    Args:
+        scale (int): Scale of the field.
+
+    Returns:
+        out (src.field.field.Field): Field. Groups on it are left by the
+            last benchmark that used it.
+    """
+    field = _fields.get(scale)
+    if field is None:
+        field = Field(FieldConfig(scale=scale))
+        generate_terrain(field, BENCH_TERRAIN_SEED, compat=False)
+        _fields[scale] = field
+    return field
+
+
+def clear_groups(field):
+    """Removes every group from a field.
+
+    Args:
+        field (src.field.field.Field): Field.
+    """
+    field.group_ids[:] = -1
+    field.groups.clear()
+    field.dirty_cells.clear()
+
+
+def place_groups(field, n_groups):
+    """Places groups on random land cells of a field, replacing others.
+
+    The same cells are chosen for the same field, and the random number
+    generation service of groups is re-seeded.
+
+    Args:
+        field (src.field.field.Field): Field.
+        n_groups (int): Number of groups.
+
+    Returns:
+        out (list[src.civ.group.Group]): Placed groups.
+    """
+    clear_groups(field)
+    lands = np.flatnonzero(field.surfaces.ravel() == Cell.SURFACE_LAND)
+    rng = np.random.default_rng(BENCH_SIM_SEED)
+    indices = rng.choice(lands, min(n_groups, len(lands)), replace=False)
+    Group.rng.seed(BENCH_SIM_SEED)
+    return [
+        Group(10, 20, [0.5, 0.5, 0.5], field.cell_at(index))
+        for index in indices.tolist()]
+
+
+def find_crossing_routes(field, n_routes):
+    """Finds fixed pairs of coastal land cells and sea cells next to them.
+
+    Args:
+        field (src.field.field.Field): Field.
+        n_routes (int): Number of pairs.
+
+    Returns:
+        out (list[tuple[int, int]]): Indices of the departure land cell and
+            the sea cell that a crossing sets out to, spread evenly over the
+            coasts.
+    """
+    surfaces = field.surfaces.ravel()
+    neighbors = field.neighbor_indices.reshape(-1, 6)
+    coastal = (surfaces == Cell.SURFACE_LAND) & (
+        surfaces[neighbors] == Cell.SURFACE_SEA).any(axis=1)
+    departures = np.flatnonzero(coastal)
+    departures = departures[
+        np.linspace(0, len(departures) - 1, n_routes).astype(np.intp)]
+    routes = []
+    for index in departures.tolist():
+        seas = neighbors[index][surfaces[neighbors[index]]
+                                == Cell.SURFACE_SEA]
+        routes.append((index, int(seas[0])))
+    return routes
+
+
+def iter_cases(scales, group_counts):
+    """Iterates over benchmark cases.
+
+    Preparation shared by cases, such as terrain generation, is done when a
+    case is set up, so cases that are filtered out cost nothing.
+
+    Args:
+        scales (Iterable[int]): Scales of fields for field and terrain
+            cases.
+        group_counts (Iterable[int]): Numbers of groups for group cases.
+
+    Yields:
+        out (tuple[str, Callable, Callable | None]): Name, function to time
+            and its setup function.
+    """
+    for scale in scales:
+        config = FieldConfig(scale=scale)
+        suffix = f"[scale={scale}]"
+
+        yield f"field.Field{suffix}", lambda c=config: Field(c), None
+        yield (
+            f"field.init_neighborhood_of_cells{suffix}",
+            Field.init_neighborhood_of_cells,
+            lambda s=scale: (get_field(s),))
+
+        for compat in (True, False):
+            yield (
+                f"terrain.generate_terrain[scale={scale},compat={compat}]",
+                lambda field, compat=compat: generate_terrain(
+                    field, BENCH_TERRAIN_SEED, compat),
+                lambda c=config: (Field(c),))
+
+        def draw_gauss_setup(s=scale):
+            rng = np.random.default_rng(BENCH_TERRAIN_SEED)
+            return get_field(s), lambda mu, sigma, n: rng.normal(mu, sigma, n)
+
+        yield f"terrain.calc_elevs{suffix}", calc_elevs, draw_gauss_setup
+        for phase in (determine_sea_or_land, label_components, calc_stpns,
+                      calc_land_dists):
+            yield (
+                f"terrain.{phase.__name__}{suffix}", phase,
+                lambda s=scale: (get_field(s),))
+
+        for color_func in BENCH_COLOR_FUNCS:
+            def render_setup(s=scale):
+                field = get_field(s)
+                surface = pygame.Surface(
+                    (2*field.width + 1, 2*field.height), pygame.SRCALPHA)
+                return surface, field
+            yield (
+                f"render.render_field[scale={scale},"
+                f"color_func={color_func.__name__}]",
+                lambda surface, field, f=color_func: render_field(
+                    surface, field, f),
+                render_setup)
+
+    for n_groups in group_counts:
+        suffix = f"[n_groups={n_groups}]"
+
+        def update_all(groups):
+            for group in groups:
+                if group.alive:
+                    group.update()
+
+        yield (
+            f"group.Group.update{suffix}", update_all,
+            lambda n=n_groups: (place_groups(
+                get_field(BENCH_GROUP_SCALE), n),))
+        yield (
+            f"simulation.Simulation.step{suffix}", Simulation.step,
+            lambda n=n_groups: (Simulation(
+                get_field(BENCH_GROUP_SCALE),
+                place_groups(get_field(BENCH_GROUP_SCALE), n)),))
+        yield (
+            f"simulation.Simulation.step[engine=table,n_groups={n_groups}]",
+            Simulation.step,
+            lambda n=n_groups: (Simulation(
+                get_field(BENCH_GROUP_SCALE),
+                place_groups(get_field(BENCH_GROUP_SCALE), n),
+                engine="table"),))
+
+    def cross_setup():
+        field = get_field(BENCH_GROUP_SCALE)
+        clear_groups(field)
+        Group.rng.seed(BENCH_SIM_SEED)
+        crossings = []
+        for departure, sea in find_crossing_routes(field, BENCH_N_CROSSINGS):
+            group = Group(10, 20, [0.5, 0.5, 0.5], field.cell_at(departure))
+            group.popl_emig = 5
+            crossings.append((group, field.cell_at(sea)))
+        return (crossings,)
+
+    def cross_all(crossings):
+        for group, sea in crossings:
+            group.cross_sea(sea)
+
+    yield (
+        f"group.Group.cross_sea[n_crossings={BENCH_N_CROSSINGS}]",
+        cross_all, cross_setup)
+
+
+def run_benchmarks(scales, group_counts, repeats=BENCH_REPEATS,
+                   name_filter=None):
+    """Runs benchmark cases and prints their times.
+
+    Args:
+        scales (Iterable[int]): Scales of fields for field and terrain
+            cases.
+        group_counts (Iterable[int]): Numbers of groups for group cases.
+        repeats (int): Number of runs of every case.
+        name_filter (str | None): Text that the names of the cases to run
+            must contain. If `None`, all cases are run.
+
+    Returns:
+        out (dict[str, dict]): Times of every case keyed by its name.
+    """
+    results = {}
+    for name, run, setup in iter_cases(scales, group_counts):
+        if name_filter is not None and name_filter not in name:
+            continue
+        results[name] = measure(run, setup, repeats)
+        print(
+            f"{name}: min {1000*results[name]['min']:.3f} ms, "
+            f"median {1000*results[name]['median']:.3f} ms", flush=True)
+    return results
+
+
+def compare_results(results, baseline, threshold=BENCH_THRESHOLD,
+                    tolerance=BENCH_TOLERANCE):
+    """Compares the minimum times of cases with a baseline.
+
+    Minimum times are compared because they are the least affected by other
+    load on the machine.
+
+    Args:
+        results (dict[str, dict]): Times of every case keyed by its name.
+        baseline (dict[str, dict]): Times of a baseline run.
+        threshold (float): Ratio to the baseline above which a case is
+            regarded as a regression.
+        tolerance (float): Slowdown from the baseline (ms) up to which a
+            case is not regarded as a regression whatever the ratio.
+
+    Returns:
+        out (list[tuple[str, float, float, bool]]): Name, minimum time (s),
+            ratio to the baseline and whether it is a regression, for every
+            case that the baseline also has.
+    """
+    rows = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        time_base = baseline[name]["min"]
+        ratio = result["min"]/max(time_base, 1e-12)
+        regressed = (
+            ratio > threshold and 1000*(result["min"] - time_base) > tolerance)
+        rows.append((name, result["min"], ratio, regressed))
+    return rows
+
+
+def parse_args(args=None):
+    """Parses command-line arguments.
+
+    Args:
+        args (list[str] | None): Arguments. If `None`, `sys.argv` is used.
+
+    Returns:
+        out (argparse.Namespace): Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.bench",
+        description="Time terrain, rendering and simulation hot paths.")
+    parser.add_argument(
+        "--quick", action="store_true",
+        help="run only the smallest field and group count")
+    parser.add_argument(
+        "--filter", help="run only cases whose name contains this text")
+    parser.add_argument(
+        "--repeats", type=int, default=BENCH_REPEATS,
+        help="number of runs of every case")
+    parser.add_argument("--output", help="path to write results as JSON to")
+    parser.add_argument(
+        "--baseline", default=BENCH_BASELINE_PATH,
+        help="path to results of an earlier run to compare with (default: "
+        "bench/baseline.json)")
+    parser.add_argument(
+        "--no-baseline", action="store_true",
+        help="do not compare with a baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=BENCH_THRESHOLD,
+        help="ratio to the baseline above which a case is a regression")
+    parser.add_argument(
+        "--tolerance", type=float, default=BENCH_TOLERANCE,
+        help="slowdown from the baseline in ms that is never a regression")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+
+    scales = BENCH_QUICK_SCALES if args.quick else BENCH_SCALES
+    group_counts = (
+        BENCH_QUICK_GROUP_COUNTS if args.quick else BENCH_GROUP_COUNTS)
+    results = run_benchmarks(scales, group_counts, args.repeats, args.filter)
+    pygame.quit()
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": BENCH_VERSION,
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "platform": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+
+    if args.no_baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("version") != BENCH_VERSION:
+        print(f"\nbaseline has another version, not compared: "
+              f"{args.baseline}")
+        return 0
+    rows = compare_results(
+        results, baseline["results"], args.threshold, args.tolerance)
+    print()
+    for name, time_min, ratio, regressed in rows:
+        mark = "  REGRESSION" if regressed else ""
+        print(f"{name}: {1000*time_min:.3f} ms ({ratio:.2f}x){mark}")
+    n_regressions = sum(regressed for *_, regressed in rows)
+    print(f"{n_regressions} regressions in {len(rows)} cases")
+    return 1 if n_regressions > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Module for rendering the visible part of a field that wraps east-west."""
+
+import math
+
+import pygame
+
+
+def calc_visible_tiles(src_size, period, dst_pos, scale, view_size):
+    """Calculates the parts of a wrapping surface that are visible in a view.
+
+    The source surface repeats horizontally every `period` pixels, and may
+    be wider than the period, such as by the half cells that odd rows stick
+    out by. Each repetition (tile) is drawn with its full width, so adjacent
+    tiles overlap where the source is wider than the period.
+
+    Args:
+        src_size (tuple[int, int]): Width and height of the source surface.
+        period (int): Width that the source repeats every (px).
+        dst_pos (tuple[float, float]): Position in the view that the origin
+            of the source is drawn at (px).
+        scale (float): Scale from source pixels to view pixels.
+        view_size (tuple[int, int]): Width and height of the view.
+
+    Returns:
+        out (list[tuple[tuple, tuple]]): Source rectangle and destination
+            rectangle of every visible part, each as (x, y, width, height).
+    """
+    src_w, src_h = src_size
+    dst_x, dst_y = dst_pos
+    view_w, view_h = view_size
+
+    # Rows do not wrap
+    v_start = max(math.floor(-dst_y/scale), 0)
+    v_end = min(math.ceil((view_h - dst_y)/scale), src_h)
+    if v_start >= v_end:
+        return []
+    y_start = round(dst_y + scale*v_start)
+    y_end = round(dst_y + scale*v_end)
+    if y_start >= y_end:
+        return []
+
+    # Columns of the source in unwrapped coordinates
+    u_start = math.floor(-dst_x/scale)
+    u_end = math.ceil((view_w - dst_x)/scale)
+
+    tiles = []
+    for k in range(u_start//period - 1, (u_end - 1)//period + 1):
+        tile_start = k*period
+        start = max(u_start, tile_start)
+        end = min(u_end, tile_start + src_w)
+        if start >= end:
+            continue
+        x_start = round(dst_x + scale*start)
+        x_end = round(dst_x + scale*end)
+        if x_start >= x_end:
+            continue
+        tiles.append((
+            (start - tile_start, v_start, end - start, v_end - v_start),
+            (x_start, y_start, x_end - x_start, y_end - y_start)))
+    return tiles
+
+
+def render_wrapped(surface, src_surface, period, dst_pos, scale):
+    """Renders a wrapping surface scaled and clipped to another surface.
+
+    Only the visible parts of the source are scaled, so the cost depends on
+    the size of the destination surface rather than on the scale.
+
+    Args:
+        surface (pygame.Surface): Surface to render on.
+        src_surface (pygame.Surface): Surface that repeats horizontally.
+        period (int): Width that the source repeats every (px).
+        dst_pos (tuple[float, float]): Position on `surface` that the origin
+            of the source is drawn at (px).
+        scale (float): Scale from source pixels to destination pixels.
+    """
+    tiles = calc_visible_tiles(
+        src_surface.get_size(), period, dst_pos, scale, surface.get_size())
+    for src_rect, dst_rect in tiles:
+        part = src_surface.subsurface(src_rect)
+        surface.blit(
+            pygame.transform.scale(part, dst_rect[2:]), dst_rect[:2])
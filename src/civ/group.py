@@ -1,22 +1,24 @@
 """Module for groups."""
 
-import random
+import itertools
+import math
+import time
 
 import numpy as np
 
 from src import EPSILON
-from src.field import (
-    CELL_DISTANCE,
-    FIELD_COORD_X_MAX,
-    N_DIM_FIELD,
-)
+from src.civ.rng import SimRandom
+from src.field import N_DIM_FIELD
 from src.field.cell import Cell
 
+_group_ids = itertools.count()
+
 
 class Group:
     """Group that has a population of 1 or more.
 
     Attributes:
+        id (int): Unique ID of this group.
         popl (int): Population. If this value is 0 or less, this group will
             perish.
         food (int): Number of food.
@@ -31,6 +33,14 @@ class Group:
             every element is in the range from 0.0 to 1.0.
         cell (src.field.cell.Cell): Cell that this group exists on.
         alive (bool): Indicates if this group is alive.
+        rng (src.civ.rng.SimRandom): Random number generation service shared
+            by all groups. Re-seed it with `Group.rng.seed()` to reproduce a
+            simulation.
+        n_crossings (int): Number of sea crossings that all groups have set
+            out on. This is a counter for statistics, and is not a part of
+            the state of simulations.
+        timer (src.timing.PhaseTimer | None): Timer that the time of the
+            phases of `update()` is added to. If `None`, they are not timed.
     """
     POPL_INCR_MAX = 3
 
@@ -59,6 +69,10 @@ class Group:
     CHAR_MUTATE_PARAM_2 = 5.0
     CHAR_MUTATE_PARAM_3 = 50
 
+    rng = SimRandom()
+    n_crossings = 0
+    timer = None
+
     def __init__(self, popl, food, character, cell):
         """Group that has a population of 1 or more.
 
@@ -69,6 +83,8 @@ class Group:
                 vector, and every element must be in the range from 0.0 to 1.0.
             cell (src.field.cell.Cell): Cell which this group exists on.
         """
+        self.id = next(_group_ids)
+
         self.popl = popl
         self.food = food
         self.diff = Group.DIFF_INIT
@@ -91,7 +107,7 @@ class Group:
         if self.food > 0:
             if self.popl >= 2:
                 # Population increase
-                self.popl += random.randint(0, Group.POPL_INCR_MAX)
+                self.popl += Group.rng.growth.randint(0, Group.POPL_INCR_MAX)
             self.diff *= Group.DIFF_COMMON_RATIO_INCR
         elif self.food < 0:
             # Starvation
@@ -100,9 +116,10 @@ class Group:
             self.diff *= Group.DIFF_COMMON_RATIO_DECR
         else:
             # Natural decline in population
-            if random.random() < Group.POPL_DECR_PROB:
+            if Group.rng.growth.random() < Group.POPL_DECR_PROB:
                 self.popl_decr = min(
-                    random.randint(0, Group.POPL_DECR_MAX), self.popl)
+                    Group.rng.growth.randint(0, Group.POPL_DECR_MAX),
+                    self.popl)
 
             # Difficulty increase due to settlement
             self.diff *= Group.DIFF_COMMON_RATIO_SETL
@@ -125,12 +142,14 @@ class Group:
                 weight += self.EMIG_DEST_WEIGHT_PARAM_1
             elif candidate.surface == Cell.SURFACE_LAND:
                 if candidate.group == None:
-                    weight += self.EMIG_DEST_WEIGHT_PARAM_2/candidate.stpn
+                    # Flat cells, such as ones set by hand, have no stpn
+                    weight += self.EMIG_DEST_WEIGHT_PARAM_2/max(
+                        candidate.stpn, EPSILON)
                 else:
                     group = candidate.group
                     weight += group.food/(group.diff*group.popl)
             weights.append(weight)
-        dest = random.choices(candidates, weights=weights, k=1)[0]
+        dest = candidates[Group.rng.emigration.choice_index(weights)]
         return dest
 
     def emigrate_to_empty_cell(self, dest):
@@ -159,45 +178,13 @@ class Group:
         """
         gpopl = group.popl
         group.popl += self.popl_emig
+        group.cell.field.dirty_cells.add(group.cell.index)
 
         # Blend the character of the other group and the immigrants
         ipopl = self.popl_emig  # Immigrant population
         group.character = (
             gpopl*group.character + ipopl*self.character)/(gpopl + ipopl)
 
-    def set_temporary_dest_for_crossing(self, cell_curr):
-        """Set a temporary destination cell in the route for crossing.
-
-        Args:
-            cell_curr (src.field.cell.Cell): Cell that serves as the departure
-                point for the destination.
-
-        Returns:
-            out (src.field.cell.Cell): Temporary destination cell.
-        """
-        while True:
-            direction = np.array(
-                [random.random() for _ in range(N_DIM_FIELD)]) - 0.5
-            direction_norm = np.linalg.norm(direction)
-            if direction_norm > 0.0:
-                break
-        temp_dest = direction/direction_norm
-        temp_dest *= random.uniform(
-            Group.CROS_TEMP_DEST_DIST_MIN, Group.CROS_TEMP_DEST_DIST_MAX)
-        temp_dest += cell_curr.coord
-        return temp_dest
-
-    def calc_vanish_prob_for_crossing(self, total_dist):
-        """Calculate the probability of vanishing during the crossing.
-
-        Args:
-            total_dist (float): Total distance of the crossing (m).
-
-        Returns:
-            out (float): Probability of vanishing.
-        """
-        return 2*total_dist/Group.CROS_TOTAL_DIST_MAX**2
-
     def cross_sea(self, departure_cell):
         """Cross the sea and emigrate to another cell or group.
 
@@ -209,44 +196,23 @@ class Group:
             out (src.civ.group.Group | None): New group if the emigrants move
                 to a cell that no groups exist on. Otherwise, None.
         """
-        new_group = None
+        timer = Group.timer
+        if timer is not None:
+            time_start = time.perf_counter()
 
-        # Departure
-        cell_curr = departure_cell
-        temp_dest = self.set_temporary_dest_for_crossing(cell_curr)
-        total_dist = CELL_DISTANCE
-
-        while total_dist < Group.CROS_TOTAL_DIST_MAX:
-            # Vanish during the crossing
-            vanish_prob = self.calc_vanish_prob_for_crossing(total_dist)
-            if random.random() < vanish_prob:
-                break
-
-            # Determine the next cell to proceed
-            candidates_and_dists = []
-            candidates = [cell_curr] + cell_curr.neighborhood
-            for candidate in candidates:
-                x_dist_1, y_dist = temp_dest - candidate.coord
-                x_dist_2 = abs(x_dist_1 - FIELD_COORD_X_MAX)
-                x_dist = min(abs(x_dist_1), x_dist_2)
-                dist = x_dist**2 + y_dist**2
-                candidates_and_dists.append((candidate, dist))
-            cell_next, dist = min(candidates_and_dists, key=lambda x: x[1])
-
-            # Landing
-            if cell_next.surface == Cell.SURFACE_LAND:
-                if cell_next.group == None:
-                    new_group = self.emigrate_to_empty_cell(cell_next)
-                else:
-                    self.emigrate_to_other_group(cell_next.group)
-                break
+        new_group = None
+        Group.n_crossings += 1
 
-            # Re-determine a temporary destination
-            if cell_next == cell_curr or dist < CELL_DISTANCE**2:
-                temp_dest = self.set_temporary_dest_for_crossing(cell_next)
-            cell_curr = cell_next
-            total_dist += CELL_DISTANCE
+        # Landing
+        cell = find_landing_cell(departure_cell, Group.rng.crossing)
+        if cell is not None:
+            if cell.group == None:
+                new_group = self.emigrate_to_empty_cell(cell)
+            else:
+                self.emigrate_to_other_group(cell.group)
 
+        if timer is not None:
+            timer.add("group.cross_sea", time.perf_counter() - time_start)
         return new_group
 
     def emigrate(self):
@@ -261,7 +227,7 @@ class Group:
         if self.popl_decr <= 0:
             # The population does not decrease
             return new_group
-        self.popl_emig = random.randint(0, self.popl_decr)
+        self.popl_emig = Group.rng.emigration.randint(0, self.popl_decr)
         if self.popl_emig <= 0:
             # No one is going to emigrate
             return new_group
@@ -296,12 +262,13 @@ class Group:
 
     def mutate_character(self):
         """Mutates this group's character randomly."""
+        stream = Group.rng.mutation
         direction = np.array(
-            [random.random() for _ in range(Group.N_DIM_CHARACTER)]) - 0.5
+            [stream.random() for _ in range(Group.N_DIM_CHARACTER)]) - 0.5
         direction_norm = np.linalg.norm(direction)
         if direction_norm <= 0.0:
             return
-        magnitude = random.uniform(
+        magnitude = stream.uniform(
             0.0, Group.CHAR_MUTATE_PARAM_1)/(Group.CHAR_MUTATE_PARAM_2
                 + self.popl/Group.CHAR_MUTATE_PARAM_3)
         delta = magnitude/direction_norm*direction
@@ -323,16 +290,217 @@ class Group:
             out (src.civ.group.Group | None): New group if the emigrants move
                 to a cell that no groups exist on. Otherwise, None.
         """
+        # Phases are lapped only while a timer is set. Emigration includes
+        # sea crossings, which time themselves as well.
+        timer = Group.timer
+        if timer is not None:
+            timer.start()
+
         self.popl_decr = 0
         self.popl_emig = 0
 
         self.mutate_character()
+        if timer is not None:
+            timer.lap("group.mutate")
 
         self.consume_food()
+        if timer is not None:
+            timer.lap("group.consume")
         new_group = self.emigrate()
+        if timer is not None:
+            timer.lap("group.emigrate")
         self.decrease_popl()
         self.produce_food()
 
         self.perish()
 
+        # Character, difficulty and population have changed
+        self.cell.field.dirty_cells.add(self.cell.index)
+        if timer is not None:
+            timer.lap("group.produce")
+
         return new_group
+
+
+def reserve_group_ids(next_id):
+    """Makes new groups get IDs that are equal to or greater than a value.
+
+    This is used when groups with existing IDs are restored.
+
+    Args:
+        next_id (int): Smallest ID that new groups can get.
+    """
+    global _group_ids
+    _group_ids = itertools.count(max(next_id, next(_group_ids)))
+
+
+def set_temporary_dest_for_crossing(cell_curr, stream):
+    """Set a temporary destination cell in the route for crossing.
+
+    Args:
+        cell_curr (src.field.cell.Cell): Cell that serves as the departure
+            point for the destination.
+        stream (src.civ.rng.RandomStream): Stream of random numbers.
+
+    Returns:
+        out (numpy.ndarray): Coordinate of the temporary destination.
+    """
+    while True:
+        direction = np.array(
+            [stream.random() for _ in range(N_DIM_FIELD)]) - 0.5
+        direction_norm = np.linalg.norm(direction)
+        if direction_norm > 0.0:
+            break
+    temp_dest = direction/direction_norm
+    temp_dest *= stream.uniform(
+        Group.CROS_TEMP_DEST_DIST_MIN, Group.CROS_TEMP_DEST_DIST_MAX)
+    temp_dest += cell_curr.coord
+    return temp_dest
+
+
+def calc_vanish_prob_for_crossing(total_dist):
+    """Calculate the probability of vanishing during the crossing.
+
+    Args:
+        total_dist (float | numpy.ndarray): Total distance of the crossing
+            (m).
+
+    Returns:
+        out (float | numpy.ndarray): Probability of vanishing.
+    """
+    return 2*total_dist/Group.CROS_TOTAL_DIST_MAX**2
+
+
+def find_landing_cell(departure_cell, stream):
+    """Crosses the sea and finds the land cell to land on.
+
+    Emigrants head for a temporary destination along the hex line to it, one
+    cell per step, and pick a new one when they reach it. Each line is
+    scanned for the first land cell at once, and the chance of surviving
+    until then is decided with a single random number. The crossing ends
+    without landing as soon as the nearest land is farther than the
+    remaining steps, unless `land_dists` of the field is unknown.
+
+    Args:
+        departure_cell (src.field.cell.Cell): Cell that serves as the
+            departure point for the crossing.
+        stream (src.civ.rng.RandomStream): Stream of random numbers.
+
+    Returns:
+        out (src.field.cell.Cell | None): Land cell to land on. None if the
+            emigrants vanish during the crossing.
+    """
+    field = departure_cell.field
+    config = field.config
+    coords = field.coords.reshape(-1, N_DIM_FIELD)
+    surfaces = field.surfaces.ravel()
+    land_dists = field.land_dists.ravel()
+
+    # Departure
+    index_curr = departure_cell.index
+    temp_dest = set_temporary_dest_for_crossing(departure_cell, stream)
+    total_dist = config.cell_distance
+
+    while total_dist < Group.CROS_TOTAL_DIST_MAX:
+        # Land is out of reach. Distances are -1 if they are unknown, such
+        # as on fields whose surfaces are set by hand, and then the route is
+        # followed without this bound.
+        n_steps_max = math.ceil(
+            (Group.CROS_TOTAL_DIST_MAX - total_dist)/config.cell_distance)
+        if land_dists[index_curr] > n_steps_max:
+            break
+
+        # Route to the temporary destination
+        route = field.trace_line(coords[index_curr], temp_dest)[1:]
+        if len(route) == 0:
+            # Stay on the current cell for a step
+            route = np.array([index_curr])
+        route = route[:n_steps_max]
+        lands = np.flatnonzero(surfaces[route] == Cell.SURFACE_LAND)
+        n_steps = lands[0] + 1 if len(lands) > 0 else len(route)
+
+        # Vanish during the crossing
+        dists = total_dist + config.cell_distance*np.arange(n_steps)
+        survival_prob = np.prod(1.0 - calc_vanish_prob_for_crossing(dists))
+        if stream.random() >= survival_prob:
+            break
+
+        # Landing
+        if len(lands) > 0:
+            return field.cell_at(route[lands[0]])
+
+        # Re-determine a temporary destination
+        index_curr = route[-1]
+        temp_dest = set_temporary_dest_for_crossing(
+            field.cell_at(index_curr), stream)
+        total_dist += config.cell_distance*n_steps
+
+    return None
+
+
+def calc_emig_dest_weights(field, cells, occupants, calc_occupant_weights):
+    """Calculates the weights of neighbor cells for emigration at once.
+
+    The weights follow the same formula as `Group.select_dest_for_emig()`,
+    where steepness is clamped to `EPSILON` so that flat cells get finite
+    weights.
+
+    Args:
+        field (src.field.field.Field): Field that the cells are on.
+        cells (numpy.ndarray): Indices of the cells emigrants leave.
+        occupants (numpy.ndarray): Key of the group that exists on each
+            cell, such as `field.group_ids`, or a negative value if none
+            does.
+        calc_occupant_weights (Callable[[numpy.ndarray], numpy.ndarray]):
+            Function that calculates the weights of neighbor cells that
+            groups exist on, i.e., food/(diff*popl) of the groups, from the
+            values of `occupants` on the cells.
+
+    Returns:
+        out (tuple[numpy.ndarray, numpy.ndarray]): Indices of neighbor cells
+            and their weights, both shaped (len(cells), 6). Slots that are not
+            actual neighbors have a weight of 0.
+    """
+    neighbor_indices = field.neighbor_indices.reshape(-1, 6)[cells]
+    neighbor_mask = field.neighbor_mask.reshape(-1, 6)[cells]
+    surfaces = field.surfaces.ravel()[neighbor_indices]
+    stpns = field.stpns.ravel()[neighbor_indices]
+    keys = occupants.ravel()[neighbor_indices]
+
+    weights = np.full(neighbor_indices.shape, EPSILON, dtype=np.float64)
+    sea = surfaces == Cell.SURFACE_SEA
+    weights[sea] += Group.EMIG_DEST_WEIGHT_PARAM_1
+    land = surfaces == Cell.SURFACE_LAND
+    empty = land & (keys < 0)
+    weights[empty] += Group.EMIG_DEST_WEIGHT_PARAM_2/np.maximum(
+        stpns[empty], EPSILON)
+    occupied = land & (keys >= 0)
+    weights[occupied] += calc_occupant_weights(keys[occupied])
+    weights[~neighbor_mask] = 0.0
+    return neighbor_indices, weights
+
+
+def sample_emig_dests(neighbor_indices, weights, stream):
+    """Samples destinations for emigration by inverse transform sampling.
+
+    One uniform random number is drawn per row and compared with the
+    cumulative sum of the weights in the row, so each slot is chosen with a
+    probability proportional to its weight.
+
+    Args:
+        neighbor_indices (numpy.ndarray): Indices of neighbor cells shaped
+            (n, 6).
+        weights (numpy.ndarray): Weights of the neighbor cells shaped (n, 6).
+        stream (src.civ.rng.RandomStream): Stream of random numbers.
+
+    Returns:
+        out (numpy.ndarray): Indices of the destination cells.
+    """
+    n = len(weights)
+    cum_weights = np.cumsum(weights, axis=-1)
+    thresholds = stream.randoms(n)*cum_weights[:, -1]
+    slots = np.count_nonzero(
+        cum_weights <= thresholds[:, np.newaxis], axis=-1)
+    slots = np.minimum(slots, weights.shape[-1] - 1)
+    return neighbor_indices[np.arange(n), slots]
+
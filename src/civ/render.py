@@ -1,14 +1,60 @@
 """Module for rendering civilization systems."""
 
-import matplotlib.cm as cm
 import numpy as np
 import pygame
 
-from src.field.render import calc_cell_rect
+from src.field.render import (
+    RENDER_VIRIDIS_LUT,
+    calc_cell_rect,
+    calc_colormap_indices,
+)
 
 RENDER_POPL_MAX = 250
 RENDER_DIFF_MAX = 5.0
 
+RENDER_POPL_LUT = RENDER_VIRIDIS_LUT[calc_colormap_indices(
+    np.arange(RENDER_POPL_MAX + 1)/RENDER_POPL_MAX)]
+
+
+def calc_popl_colors(popls):
+    """Calculates the rendering colors based on groups' population.
+
+    Args:
+        popls (numpy.ndarray): Population of groups.
+
+    Returns:
+        out (numpy.ndarray): Colors (RGBA) shaped (..., 4).
+    """
+    return RENDER_POPL_LUT[np.clip(popls, 0, RENDER_POPL_MAX)]
+
+
+def calc_diff_colors(diffs):
+    """Calculates the rendering colors based on groups' difficulty.
+
+    Args:
+        diffs (numpy.ndarray): Difficulty of groups.
+
+    Returns:
+        out (numpy.ndarray): Colors (RGBA) shaped (..., 4).
+    """
+    x = np.clip(diffs, 0, RENDER_DIFF_MAX)/RENDER_DIFF_MAX
+    return RENDER_VIRIDIS_LUT[calc_colormap_indices(x)]
+
+
+def calc_character_colors(characters):
+    """Calculates the rendering colors based on groups' character.
+
+    Args:
+        characters (numpy.ndarray): Character of groups shaped (..., 3).
+
+    Returns:
+        out (numpy.ndarray): Colors (RGBA) shaped (..., 4).
+    """
+    colors = np.empty(characters.shape[:-1] + (4,), dtype=np.uint8)
+    colors[..., 0:3] = 255.0*characters
+    colors[..., 3] = 255
+    return colors
+
 
 def calc_popl_color(group):
     """Calculates the rendering color based on a group's population.
@@ -19,9 +65,7 @@ def calc_popl_color(group):
     Returns:
         out (np.ndarray): Color vector (RGBA).
     """
-    x = max(0, min(group.popl, RENDER_POPL_MAX))/RENDER_POPL_MAX
-    color = 255.0*np.array(cm.viridis(x), dtype=np.float64)
-    return color
+    return calc_popl_colors(group.popl).astype(np.float64)
 
 
 def calc_diff_color(group):
@@ -33,9 +77,7 @@ def calc_diff_color(group):
     Returns:
         out (np.ndarray): Color vector (RGBA).
     """
-    x = max(0, min(group.diff, RENDER_DIFF_MAX))/RENDER_DIFF_MAX
-    color = 255.0*np.array(cm.viridis(x), dtype=np.float64)
-    return color
+    return calc_diff_colors(group.diff).astype(np.float64)
 
 
 def calc_character_color(group):
@@ -68,3 +110,110 @@ def render_group(surface, group, color_func):
     color = color_func(group)
     rect = calc_cell_rect(group.cell)
     pygame.draw.rect(surface, color, rect)
+
+
+class GroupLayer:
+    """Layer where groups on a field are rendered incrementally.
+
+    The layer remembers the color it has rendered on every cell, and only
+    rewrites the pixels of cells whose color has changed.
+
+    Attributes:
+        surface (pygame.Surface): Surface to render groups. Must have
+            per-pixel alpha.
+        field (src.field.field.Field): Field that groups exist on.
+        attr (str): Name of the group attribute that determines colors.
+        color_func (Callable[numpy.ndarray, numpy.ndarray]): Function to
+            calculate the rendering colors from the attribute values of
+            groups, such as `calc_popl_colors()`.
+        colors (numpy.ndarray): Colors (RGBA) rendered on every cell. Shaped
+            (height*width, 4).
+    """
+
+    def __init__(self, surface, field, attr, color_func):
+        """Layer where groups on a field are rendered incrementally.
+
+        Args:
+            surface (pygame.Surface): Surface to render groups. Must have
+                per-pixel alpha.
+            field (src.field.field.Field): Field that groups exist on.
+            attr (str): Name of the group attribute that determines colors.
+            color_func (Callable[numpy.ndarray, numpy.ndarray]): Function to
+                calculate the rendering colors from the attribute values of
+                groups.
+        """
+        self.surface = surface
+        self.field = field
+        self.attr = attr
+        self.color_func = color_func
+
+        self.colors = np.zeros((field.n_cells, 4), dtype=np.uint8)
+        self.surface.fill([0, 0, 0, 0])
+
+    def calc_colors(self, indices, frame=None):
+        """Calculates the colors of cells.
+
+        Args:
+            indices (numpy.ndarray): Indices of cells.
+            frame (src.civ.worker.GroupFrame | None): Frame that the state of
+                groups is read from. If `None`, it is read from the field.
+
+        Returns:
+            out (numpy.ndarray): Colors (RGBA) shaped (len(indices), 4).
+                Cells that no groups exist on are transparent.
+        """
+        colors = np.zeros((len(indices), 4), dtype=np.uint8)
+        if frame is not None:
+            occupied = np.flatnonzero(frame.occupied[indices])
+            if len(occupied) > 0:
+                values = getattr(frame, self.attr)[indices[occupied]]
+                colors[occupied] = self.color_func(values)
+            return colors
+        group_ids = self.field.group_ids.ravel()[indices]
+        occupied = np.flatnonzero(group_ids >= 0)
+        if len(occupied) > 0:
+            values = np.array([
+                getattr(self.field.groups[group_id], self.attr)
+                for group_id in group_ids[occupied]])
+            colors[occupied] = self.color_func(values)
+        return colors
+
+    def update(self, indices, frame=None):
+        """Re-renders cells whose color may have changed.
+
+        Args:
+            indices (numpy.ndarray): Indices of the cells to re-render, such
+                as the ones returned by
+                `src.field.field.Field.take_dirty_cells()`.
+            frame (src.civ.worker.GroupFrame | None): Frame that the state of
+                groups is read from. If `None`, it is read from the field.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        colors = self.calc_colors(indices, frame)
+        changed = np.any(colors != self.colors[indices], axis=-1)
+        indices, colors = indices[changed], colors[changed]
+        if len(indices) == 0:
+            return
+        self.colors[indices] = colors
+
+        # Every cell is a 2x2 block of pixels
+        rows, cols = np.divmod(indices, self.field.width)
+        xs = (2*cols + rows % 2)[:, np.newaxis] + np.array([0, 1, 0, 1])
+        ys = (2*rows)[:, np.newaxis] + np.array([0, 0, 1, 1])
+        colors = np.repeat(colors[:, np.newaxis], 4, axis=1)
+
+        pixels = pygame.surfarray.pixels3d(self.surface)
+        pixels[xs, ys] = colors[..., 0:3]
+        del pixels
+        alphas = pygame.surfarray.pixels_alpha(self.surface)
+        alphas[xs, ys] = colors[..., 3]
+        del alphas
+
+    def update_all(self, frame=None):
+        """Re-renders every cell.
+
+        Args:
+            frame (src.civ.worker.GroupFrame | None): Frame that the state of
+                groups is read from. If `None`, it is read from the field.
+        """
+        self.update(np.arange(self.field.n_cells), frame)
@@ -0,0 +1,203 @@
+"""Module for random number generation in simulations."""
+
+import bisect
+
+import numpy as np
+
+
+class RandomStream:
+    """Stream of random numbers that are drawn in batches.
+
+    Uniform random numbers are drawn from a `numpy.random.Generator` into a
+    buffer, and handed out one by one or in bulk. Other kinds of random
+    numbers are derived from them.
+
+    Attributes:
+        generator (numpy.random.Generator): Generator that fills the buffer.
+        buffer (numpy.ndarray): Uniform random numbers drawn in advance.
+        position (int): Position of the next number in the buffer.
+    """
+    BUFFER_SIZE = 4096
+
+    def __init__(self, seed_seq):
+        """Stream of random numbers that are drawn in batches.
+
+        Args:
+            seed_seq (numpy.random.SeedSequence): Seed of this stream.
+        """
+        self.generator = np.random.Generator(np.random.PCG64(seed_seq))
+        self.fill_buffer()
+
+    def fill_buffer(self):
+        """Draws new numbers into the buffer."""
+        self.buffer = self.generator.random(RandomStream.BUFFER_SIZE)
+        self._values = self.buffer.tolist()
+        self.position = 0
+
+    def random(self):
+        """Returns a random number in the range [0.0, 1.0).
+
+        Returns:
+            out (float): Random number.
+        """
+        if self.position >= len(self._values):
+            self.fill_buffer()
+        value = self._values[self.position]
+        self.position += 1
+        return value
+
+    def randoms(self, n):
+        """Returns random numbers in the range [0.0, 1.0) in bulk.
+
+        Args:
+            n (int): Number of random numbers.
+
+        Returns:
+            out (numpy.ndarray): Random numbers.
+        """
+        # NumPy integers, such as counts, must not leak into the position,
+        # which is saved as JSON
+        end = self.position + int(n)
+        if end <= len(self.buffer):
+            values = self.buffer[self.position:end]
+            self.position = end
+            return values
+        rest = self.buffer[self.position:]
+        values = np.concatenate(
+            [rest, self.generator.random(n - len(rest))])
+        self.fill_buffer()
+        return values
+
+    def randint(self, a, b):
+        """Returns a random integer in the range [a, b].
+
+        Args:
+            a (int): Minimum value.
+            b (int): Maximum value.
+
+        Returns:
+            out (int): Random integer.
+        """
+        return a + int(self.random()*(b - a + 1))
+
+    def randints(self, a, b, n=None):
+        """Returns random integers in the range [a, b] in bulk.
+
+        Args:
+            a (int | numpy.ndarray): Minimum values.
+            b (int | numpy.ndarray): Maximum values.
+            n (int | None): Number of random integers. If `None`, it is
+                determined by the shape of `a` and `b`.
+
+        Returns:
+            out (numpy.ndarray): Random integers.
+        """
+        a, b = np.asarray(a), np.asarray(b)
+        if n is None:
+            n = np.broadcast(a, b).size
+        return a + (self.randoms(n)*(b - a + 1)).astype(np.int64)
+
+    def uniform(self, a, b):
+        """Returns a random number in the range [a, b).
+
+        Args:
+            a (float): Minimum value.
+            b (float): Maximum value.
+
+        Returns:
+            out (float): Random number.
+        """
+        return a + (b - a)*self.random()
+
+    def choice_index(self, weights):
+        """Chooses an index randomly with weights.
+
+        Args:
+            weights (list[float]): Weights of indices.
+
+        Returns:
+            out (int): Chosen index.
+        """
+        cum_weights = []
+        total = 0.0
+        for weight in weights:
+            total += weight
+            cum_weights.append(total)
+        return bisect.bisect(
+            cum_weights, self.random()*total, 0, len(cum_weights) - 1)
+
+    def get_state(self):
+        """Gets the state of this stream.
+
+        Returns:
+            out (dict): State of this stream.
+        """
+        return {
+            "bit_generator": self.generator.bit_generator.state,
+            "buffer": self.buffer.copy(),
+            "position": self.position,
+        }
+
+    def set_state(self, state):
+        """Restores the state of this stream.
+
+        Args:
+            state (dict): State returned by `get_state()`.
+        """
+        self.generator.bit_generator.state = state["bit_generator"]
+        self.buffer = np.array(state["buffer"], dtype=np.float64)
+        self._values = self.buffer.tolist()
+        self.position = int(state["position"])
+
+
+class SimRandom:
+    """Random number generation service for simulations.
+
+    Every subsystem draws from its own independently seeded stream, so adding
+    draws to one subsystem does not shift the numbers of the others, and
+    code that uses the `random` module does not affect simulations.
+
+    Attributes:
+        growth (src.civ.rng.RandomStream): Stream for population change.
+        emigration (src.civ.rng.RandomStream): Stream for emigration.
+        crossing (src.civ.rng.RandomStream): Stream for sea crossing.
+        mutation (src.civ.rng.RandomStream): Stream for character mutation.
+    """
+    STREAMS = ("growth", "emigration", "crossing", "mutation")
+
+    def __init__(self, seed=None):
+        """Random number generation service for simulations.
+
+        Args:
+            seed (int | None): Seed value. If `None`, fresh entropy is used.
+        """
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """Re-seeds every stream.
+
+        Args:
+            seed (int | None): Seed value. If `None`, fresh entropy is used.
+        """
+        seed_seqs = np.random.SeedSequence(seed).spawn(len(SimRandom.STREAMS))
+        for name, seed_seq in zip(SimRandom.STREAMS, seed_seqs):
+            setattr(self, name, RandomStream(seed_seq))
+
+    def get_state(self):
+        """Gets the state of every stream.
+
+        Returns:
+            out (dict[str, dict]): States keyed by the name of streams.
+        """
+        return {
+            name: getattr(self, name).get_state()
+            for name in SimRandom.STREAMS}
+
+    def set_state(self, state):
+        """Restores the state of every stream.
+
+        Args:
+            state (dict[str, dict]): States returned by `get_state()`.
+        """
+        for name in SimRandom.STREAMS:
+            getattr(self, name).set_state(state[name])
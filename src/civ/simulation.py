@@ -0,0 +1,155 @@
+"""Module for advancing simulations turn by turn."""
+
+import time
+
+import numpy as np
+
+from src.civ.group import Group
+from src.civ.table import GroupTable
+from src.field.cell import Cell
+
+SIMULATION_ENGINES = ("group", "table")
+
+
+class Simulation:
+    """Simulation of groups on a field.
+
+    Attributes:
+        field (src.field.field.Field): Field that groups exist on.
+        groups (list[src.civ.group.Group]): Living groups in ascending order
+            of population.
+        engine (str): Engine that updates groups, one of
+            `SIMULATION_ENGINES`. `"group"` updates groups one by one, and
+            `"table"` updates them at once with `src.civ.table.GroupTable`.
+        table (src.civ.table.GroupTable | None): Table of the groups if the
+            table engine is used.
+        turn (int): Number of turns that have been advanced.
+        seed (int | None): Seed that the random number generation service of
+            groups was seeded with. None if it is unknown.
+        n_births (int): Number of groups founded in the last turn.
+        n_deaths (int): Number of groups that perished in the last turn.
+        n_crossings (int): Number of sea crossings set out on in the last
+            turn.
+        timer (src.timing.PhaseTimer | None): Timer of the phases of turns.
+            Set it with `set_timer()`.
+    """
+
+    def __init__(self, field, groups, seed=None, engine="group"):
+        """Simulation of groups on a field.
+
+        Args:
+            field (src.field.field.Field): Field that groups exist on.
+            groups (list[src.civ.group.Group]): Initial groups.
+            seed (int | None): Seed that the random number generation
+                service of groups was seeded with.
+            engine (str): Engine that updates groups, one of
+                `SIMULATION_ENGINES`. The engines draw random numbers
+                differently, so they advance the same state differently.
+
+        Raises:
+            ValueError: If the engine is unknown.
+        """
+        if engine not in SIMULATION_ENGINES:
+            raise ValueError(f"unknown engine: {engine}")
+        self.field = field
+        self.groups = sorted(groups, key=lambda group: group.popl)
+        self.engine = engine
+        self.table = None
+        if engine == "table":
+            self.table = GroupTable(field, Group.rng)
+            self.table.add_groups(self.groups)
+        self.turn = 0
+        self.seed = seed
+        self.n_births = 0
+        self.n_deaths = 0
+        self.n_crossings = 0
+        self.timer = None
+
+    def set_timer(self, timer):
+        """Sets the timer of the phases of turns and group updates.
+
+        The timer is shared by all groups, like their random number
+        generation service.
+
+        Args:
+            timer (src.timing.PhaseTimer | None): Timer with the phases of
+                `src.timing.TIMING_TURN_PHASES`. If `None`, turns are not
+                timed.
+        """
+        if timer is not None:
+            timer.reset()
+        self.timer = timer
+        Group.timer = timer
+
+    def step(self):
+        """Advances the simulation by a turn."""
+        timer = self.timer
+        if timer is not None:
+            time_start = time.perf_counter()
+
+        n_crossings_prev = Group.n_crossings
+        if self.table is None:
+            n_births, n_deaths = self.update_groups()
+        else:
+            n_births, n_deaths = self.table.update()
+            self.groups = self.table.group.tolist()
+        self.turn += 1
+        self.n_births = n_births
+        self.n_deaths = n_deaths
+        self.n_crossings = Group.n_crossings - n_crossings_prev
+
+        if timer is not None:
+            timer.add("turn", time.perf_counter() - time_start)
+            timer.commit()
+
+    def update_groups(self):
+        """Updates groups one by one in order of population.
+
+        Returns:
+            out (tuple[int, int]): Number of groups founded and number of
+                groups perished.
+        """
+        # Groups act in order of population size, starting with the smallest.
+        # New groups are scheduled right after the group they came from.
+        groups_next = []
+        n_births = 0
+        n_deaths = 0
+        for group in self.groups:
+            new_group = group.update()
+            if group.alive:
+                groups_next.append(group)
+            else:
+                n_deaths += 1
+            if new_group is not None and new_group.alive:
+                groups_next.append(new_group)
+                n_births += 1
+
+        # The order changes little from turn to turn, which the stable sort
+        # takes advantage of
+        timer = self.timer
+        if timer is not None:
+            timer.start()
+        groups_next.sort(key=lambda group: group.popl)
+        if timer is not None:
+            timer.lap("turn.sort")
+        self.groups = groups_next
+        return n_births, n_deaths
+
+    def summarize(self):
+        """Summarizes the current state of the simulation.
+
+        Returns:
+            out (dict[str, int]): Turn, number of groups, total population
+                and number of landmasses that groups exist on.
+        """
+        field = self.field
+        cells = np.flatnonzero(field.group_ids.ravel() >= 0)
+        labels = np.unique(field.labels.ravel()[cells])
+        n_landmasses = np.count_nonzero(
+            field.label_surfaces[labels] == Cell.SURFACE_LAND)
+        return {
+            "turn": self.turn,
+            "n_groups": len(self.groups),
+            "popl": sum(group.popl for group in self.groups),
+            "n_landmasses": int(n_landmasses),
+        }
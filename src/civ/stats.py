@@ -0,0 +1,221 @@
+"""Module for recording statistics of simulations turn by turn.
+
+Statistics are stored in a directory as columns:
+
+- `schema.json` holds the format version and the dtype of every column.
+- `<column>.bin` holds the values of a column as raw little-endian values.
+  Values are only appended, so a recording can be continued by opening it
+  again, and every column can be memory-mapped with `load_stats()`.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from src.civ.group import Group
+
+STATS_VERSION = 1
+STATS_SCHEMA_NAME = "schema.json"
+
+STATS_PERCENTILES = (10, 50, 90)
+
+STATS_COLUMNS = {
+    "turn": "<i8",
+    "n_groups": "<i8",
+    "popl": "<i8",
+    "n_births": "<i8",
+    "n_deaths": "<i8",
+    "n_crossings": "<i8",
+    **{f"food_p{q}": "<f8" for q in STATS_PERCENTILES},
+    **{f"diff_p{q}": "<f8" for q in STATS_PERCENTILES},
+    **{f"character_{k}": "<f8" for k in range(Group.N_DIM_CHARACTER)},
+}
+
+
+def calc_stats(simulation):
+    """Calculates the aggregates of the world of a simulation.
+
+    With the table engine, the columns of the table are reduced directly.
+    With the group engine, the values are first gathered from the group
+    objects, which is a Python loop over all groups every turn.
+
+    Args:
+        simulation (src.civ.simulation.Simulation): Simulation.
+
+    Returns:
+        out (dict[str, int | float]): Value of every column of
+            `STATS_COLUMNS`. Percentiles and the character centroid are NaN
+            if no groups exist.
+    """
+    table = simulation.table
+    if table is None:
+        groups = simulation.groups
+        n_groups = len(groups)
+        popls = np.fromiter(
+            (group.popl for group in groups), dtype=np.int64, count=n_groups)
+        foods = np.fromiter(
+            (group.food for group in groups), dtype=np.int64, count=n_groups)
+        diffs = np.fromiter(
+            (group.diff for group in groups), dtype=np.float64,
+            count=n_groups)
+        characters = np.array(
+            [group.character for group in groups], dtype=np.float64
+        ).reshape(n_groups, Group.N_DIM_CHARACTER)
+    else:
+        # Rows of perished groups are dropped at the end of every turn
+        n_groups = len(table)
+        popls = table.popl
+        foods = table.food
+        diffs = table.diff
+        characters = table.character
+
+    stats = {
+        "turn": simulation.turn,
+        "n_groups": n_groups,
+        "popl": int(popls.sum()),
+        "n_births": simulation.n_births,
+        "n_deaths": simulation.n_deaths,
+        "n_crossings": simulation.n_crossings,
+    }
+    if n_groups == 0:
+        percentiles = np.full(len(STATS_PERCENTILES), np.nan)
+        food_percentiles = diff_percentiles = percentiles
+        centroid = np.full(Group.N_DIM_CHARACTER, np.nan)
+    else:
+        food_percentiles = np.percentile(foods, STATS_PERCENTILES)
+        diff_percentiles = np.percentile(diffs, STATS_PERCENTILES)
+        # Centroid weighted by population, so that it follows people rather
+        # than the many small groups on the frontier
+        centroid = popls @ characters/max(popls.sum(), 1)
+    for q, food, diff in zip(
+            STATS_PERCENTILES, food_percentiles, diff_percentiles):
+        stats[f"food_p{q}"] = food
+        stats[f"diff_p{q}"] = diff
+    for k, value in enumerate(centroid):
+        stats[f"character_{k}"] = value
+    return stats
+
+
+class StatsRecorder:
+    """Recorder that appends statistics of every turn to a directory.
+
+    Values are written into preallocated column buffers, and the buffers
+    are flushed to the column files when they are full, so memory use does
+    not grow with the number of turns.
+
+    Attributes:
+        path (str): Path to the directory of the recording.
+        chunk_size (int): Number of turns that the buffers hold.
+        buffers (dict[str, numpy.ndarray]): Buffer of every column.
+        n_buffered (int): Number of turns in the buffers.
+    """
+
+    def __init__(self, path, chunk_size=4096):
+        """Recorder that appends statistics of every turn to a directory.
+
+        If the directory already holds a recording, it is continued.
+
+        Args:
+            path (str): Path to the directory of the recording.
+            chunk_size (int): Number of turns that the buffers hold.
+
+        Raises:
+            ValueError: If the existing recording has another format.
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.buffers = {
+            name: np.zeros(chunk_size, dtype=dtype)
+            for name, dtype in STATS_COLUMNS.items()}
+        self.n_buffered = 0
+
+        schema = {"version": STATS_VERSION, "columns": STATS_COLUMNS}
+        schema_path = os.path.join(path, STATS_SCHEMA_NAME)
+        if os.path.exists(schema_path):
+            with open(schema_path, encoding="utf-8") as f:
+                if json.load(f) != schema:
+                    raise ValueError(
+                        f"stats recorded in another format: {path}")
+            self.truncate_columns()
+        else:
+            os.makedirs(path, exist_ok=True)
+            with open(schema_path, "w", encoding="utf-8") as f:
+                json.dump(schema, f, indent=2)
+
+    def truncate_columns(self):
+        """Cuts the column files to the number of turns they all hold.
+
+        Columns can differ in length if a flush has been interrupted, and
+        appending to them would misalign every later turn.
+        """
+        sizes = {}
+        for name, dtype in STATS_COLUMNS.items():
+            path = os.path.join(self.path, f"{name}.bin")
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            sizes[path] = (size, np.dtype(dtype).itemsize)
+        n_turns = min(size//itemsize for size, itemsize in sizes.values())
+        for path, (size, itemsize) in sizes.items():
+            if size > n_turns*itemsize:
+                os.truncate(path, n_turns*itemsize)
+
+    def record(self, simulation):
+        """Records the statistics of the current turn of a simulation.
+
+        Args:
+            simulation (src.civ.simulation.Simulation): Simulation.
+        """
+        k = self.n_buffered
+        for name, value in calc_stats(simulation).items():
+            self.buffers[name][k] = value
+        self.n_buffered += 1
+        if self.n_buffered >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Appends the buffered turns to the column files."""
+        if self.n_buffered == 0:
+            return
+        for name, buffer in self.buffers.items():
+            with open(os.path.join(self.path, f"{name}.bin"), "ab") as f:
+                buffer[:self.n_buffered].tofile(f)
+        self.n_buffered = 0
+
+    def close(self):
+        """Flushes the buffered turns. Call this when the recording ends."""
+        self.flush()
+
+
+def load_stats(path):
+    """Loads a recording of statistics as memory-mapped columns.
+
+    Args:
+        path (str): Path to the directory of the recording.
+
+    Returns:
+        out (dict[str, numpy.ndarray]): Read-only values of every column.
+            Columns are cut to the same length in case a flush has been
+            interrupted.
+
+    Raises:
+        ValueError: If the recording has another format.
+    """
+    with open(os.path.join(path, STATS_SCHEMA_NAME), encoding="utf-8") as f:
+        schema = json.load(f)
+    if schema.get("version") != STATS_VERSION:
+        raise ValueError(f"unsupported stats version: {path}")
+
+    columns = {}
+    for name, dtype in schema["columns"].items():
+        column_path = os.path.join(path, f"{name}.bin")
+        dtype = np.dtype(dtype)
+        n_values = 0
+        if os.path.exists(column_path):
+            n_values = os.path.getsize(column_path)//dtype.itemsize
+        if n_values == 0:
+            columns[name] = np.zeros(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(
+                column_path, dtype=dtype, mode="r", shape=(n_values,))
+    n_turns = min(len(column) for column in columns.values())
+    return {name: column[:n_turns] for name, column in columns.items()}
@@ -0,0 +1,391 @@
+"""Module for a table of groups that are updated with array operations."""
+
+import numpy as np
+
+from src import EPSILON
+from src.civ.group import (
+    Group,
+    calc_emig_dest_weights,
+    find_landing_cell,
+    sample_emig_dests,
+)
+from src.civ.rng import SimRandom
+from src.field.cell import Cell
+
+
+class GroupTable:
+    """Table of groups stored as parallel arrays.
+
+    This is an alternative to updating `src.civ.group.Group` objects one by
+    one. Each phase of a turn runs for all groups at once, and only
+    emigration is resolved sequentially, in the order of the rows. Rows are
+    kept in ascending order of population like the groups of
+    `src.civ.simulation.Simulation`, so smaller groups emigrate first.
+
+    Every row has a `src.civ.group.Group` object, and the state of the rows
+    is written to the objects at the end of `update()`. The field therefore
+    holds the IDs of the groups as usual, and everything that reads groups
+    from the field or from a simulation works with either engine.
+
+    Attributes:
+        field (src.field.field.Field): Field that groups exist on.
+        rng (src.civ.rng.SimRandom): Random number generation service.
+        popl (numpy.ndarray): Population of groups.
+        food (numpy.ndarray): Number of food of groups.
+        diff (numpy.ndarray): Difficulty of groups.
+        popl_decr (numpy.ndarray): Population decline from groups.
+        character (numpy.ndarray): Character of groups shaped (n, 3).
+        cell (numpy.ndarray): Index of the cell that each group exists on.
+        alive (numpy.ndarray): Indicates if each group is alive.
+        group (numpy.ndarray): Object of each group.
+        rows (numpy.ndarray): Row of the group that exists on each cell, or
+            -1 if none does.
+    """
+    COLUMNS = (
+        "popl", "food", "diff", "popl_decr", "character", "cell", "alive",
+        "group")
+
+    def __init__(self, field, rng=None):
+        """Table of groups stored as parallel arrays.
+
+        Args:
+            field (src.field.field.Field): Field that groups exist on.
+            rng (src.civ.rng.SimRandom | None): Random number generation
+                service. If `None`, a service with a random seed is used.
+        """
+        self.field = field
+        self.rng = SimRandom() if rng is None else rng
+
+        self.popl = np.zeros(0, dtype=np.int64)
+        self.food = np.zeros(0, dtype=np.int64)
+        self.diff = np.zeros(0, dtype=np.float64)
+        self.popl_decr = np.zeros(0, dtype=np.int64)
+        self.character = np.zeros((0, Group.N_DIM_CHARACTER), dtype=np.float64)
+        self.cell = np.zeros(0, dtype=np.intp)
+        self.alive = np.zeros(0, dtype=bool)
+        self.group = np.zeros(0, dtype=object)
+        self.rows = np.full(field.group_ids.size, -1, dtype=np.intp)
+
+    def __len__(self):
+        return len(self.popl)
+
+    def resize(self, n):
+        """Resizes the arrays. New rows are filled with zeros.
+
+        Args:
+            n (int): Number of rows.
+        """
+        for name in GroupTable.COLUMNS:
+            array = getattr(self, name)
+            resized = np.zeros((n,) + array.shape[1:], dtype=array.dtype)
+            m = min(n, len(array))
+            resized[:m] = array[:m]
+            setattr(self, name, resized)
+
+    def add_groups(self, groups):
+        """Adds rows for groups that exist on the field.
+
+        Args:
+            groups (list[src.civ.group.Group]): Groups in ascending order of
+                population. Their populations must not be less than those of
+                the groups on the existing rows.
+        """
+        n_old = len(self)
+        rows = np.arange(n_old, n_old + len(groups))
+        self.resize(n_old + len(groups))
+        self.popl[rows] = [group.popl for group in groups]
+        self.food[rows] = [group.food for group in groups]
+        self.diff[rows] = [group.diff for group in groups]
+        self.character[rows] = np.array(
+            [group.character for group in groups],
+            dtype=np.float64).reshape(len(groups), Group.N_DIM_CHARACTER)
+        self.cell[rows] = [group.cell.index for group in groups]
+        self.alive[rows] = True
+        self.group[rows] = groups
+        self.rows[self.cell[rows]] = rows
+
+    def set_row(self, row, popl, food, character, cell):
+        """Sets a new group on a row.
+
+        Its object is created by `sync_groups()`.
+
+        Args:
+            row (int): Row of the new group.
+            popl (int): Population.
+            food (int): Number of food.
+            character (list | numpy.ndarray): Character.
+            cell (int): Index of the cell.
+        """
+        self.popl[row] = popl
+        self.food[row] = food
+        self.diff[row] = Group.DIFF_INIT
+        self.popl_decr[row] = 0
+        self.character[row] = character
+        self.cell[row] = cell
+        self.alive[row] = True
+        self.rows[cell] = row
+        self.field.dirty_cells.add(int(cell))
+
+    def mutate_character(self):
+        """Mutates all groups' character randomly."""
+        n = len(self)
+        stream = self.rng.mutation
+        directions = stream.randoms(n*Group.N_DIM_CHARACTER).reshape(
+            n, Group.N_DIM_CHARACTER) - 0.5
+        direction_norms = np.linalg.norm(directions, axis=-1)
+        magnitudes = Group.CHAR_MUTATE_PARAM_1*stream.randoms(n)/(
+            Group.CHAR_MUTATE_PARAM_2 + self.popl/Group.CHAR_MUTATE_PARAM_3)
+        valid = direction_norms > 0.0
+        self.character[valid] += (
+            magnitudes[valid]/direction_norms[valid])[:, np.newaxis] \
+            * directions[valid]
+        np.clip(
+            self.character, Group.CHAR_MIN, Group.CHAR_MAX,
+            out=self.character)
+
+    def consume_food(self):
+        """Consumes food and causes population change of all groups."""
+        self.food -= self.popl
+
+        # Population increase
+        surplus = self.food > 0
+        increase = surplus & (self.popl >= 2)
+        self.popl[increase] += self.rng.growth.randints(
+            0, Group.POPL_INCR_MAX, np.count_nonzero(increase))
+        self.diff[surplus] *= Group.DIFF_COMMON_RATIO_INCR
+
+        # Starvation
+        shortage = self.food < 0
+        self.popl_decr[shortage] = np.minimum(
+            -self.food[shortage], self.popl[shortage])
+        self.food[shortage] = 0
+        self.diff[shortage] *= Group.DIFF_COMMON_RATIO_DECR
+
+        # Natural decline in population
+        balance = ~surplus & ~shortage
+        balance[balance] = (
+            self.rng.growth.randoms(np.count_nonzero(balance))
+            < Group.POPL_DECR_PROB)
+        decline = np.flatnonzero(balance)
+        self.popl_decr[decline] = np.minimum(
+            self.rng.growth.randints(0, Group.POPL_DECR_MAX, len(decline)),
+            self.popl[decline])
+
+        # Difficulty increase due to settlement
+        self.diff[~surplus & ~shortage] *= Group.DIFF_COMMON_RATIO_SETL
+
+    def calc_emig_dest_weights(self, cells):
+        """Calculates the weights of neighbor cells for emigration.
+
+        Args:
+            cells (numpy.ndarray): Indices of the cells emigrants leave.
+
+        Returns:
+            out (tuple[numpy.ndarray, numpy.ndarray]): Indices of neighbor
+                cells and their weights, both shaped (len(cells), 6). Slots
+                that are not actual neighbors have a weight of 0.
+        """
+        def calc_occupant_weights(rows):
+            return self.food[rows]/(self.diff[rows]*self.popl[rows])
+
+        return calc_emig_dest_weights(
+            self.field, cells, self.rows, calc_occupant_weights)
+
+    def emigrate_to_cell(self, row, popl_emig, dest, parents, n_old):
+        """Emigrates a part of the population of a group to a land cell.
+
+        Args:
+            row (int): Row of the group that emigrants leave.
+            popl_emig (int): Population of the emigrants.
+            dest (int): Index of the destination cell.
+            parents (list[int]): Rows that new groups came from. The row of
+                this group is appended if a new group is created.
+            n_old (int): Number of rows before the emigration. New groups are
+                set on the rows that follow them.
+        """
+        dest_row = self.rows[dest]
+        if dest_row < 0:
+            # Reach a cell that no groups exist on
+            new_row = n_old + len(parents)
+            self.set_row(new_row, popl_emig, 0, self.character[row], dest)
+            self.food[new_row] = int(popl_emig/(
+                Group.DIFF_INIT*Group.FOOD_PROD_PARAM
+                * self.field.stpns.flat[dest] + EPSILON))
+            parents.append(row)
+        else:
+            # Reach another group
+            gpopl = self.popl[dest_row]
+            self.popl[dest_row] += popl_emig
+            self.character[dest_row] = (
+                gpopl*self.character[dest_row]
+                + popl_emig*self.character[row])/(gpopl + popl_emig)
+            self.field.dirty_cells.add(int(dest))
+
+    def select_dests_for_emig(self, rows):
+        """Selects the destinations for emigration of groups at once.
+
+        Weights are calculated from the state of the field before any of the
+        emigrants move.
+
+        Args:
+            rows (numpy.ndarray): Rows of the groups that emigrants leave.
+
+        Returns:
+            out (numpy.ndarray): Indices of the destination cells.
+        """
+        neighbor_indices, weights = self.calc_emig_dest_weights(
+            self.cell[rows])
+        return sample_emig_dests(
+            neighbor_indices, weights, self.rng.emigration)
+
+    def emigrate(self):
+        """Emigrates a part of the population of groups to neighbor cells.
+
+        Destinations are selected for all groups at once. Then emigrants move
+        in the order of the rows, so the first emigrants to reach an empty
+        cell found a new group and later ones join it.
+
+        Returns:
+            out (numpy.ndarray): Rows that the new groups came from.
+        """
+        popl_emig = self.rng.emigration.randints(0, self.popl_decr)
+        emigrants = np.flatnonzero(popl_emig > 0)
+        dests = self.select_dests_for_emig(emigrants)
+
+        n_old = len(self)
+        self.resize(n_old + len(emigrants))
+        parents = []
+
+        surfaces = self.field.surfaces.ravel()
+        for row, dest in zip(emigrants.tolist(), dests.tolist()):
+            if surfaces[dest] == Cell.SURFACE_SEA:
+                # Cross the sea
+                Group.n_crossings += 1
+                cell = find_landing_cell(
+                    self.field.cell_at(dest), self.rng.crossing)
+                if cell is None:
+                    continue
+                dest = cell.index
+            self.emigrate_to_cell(row, popl_emig[row], dest, parents, n_old)
+
+        self.resize(n_old + len(parents))
+        return np.array(parents, dtype=np.intp)
+
+    def decrease_popl(self, rows):
+        """Decreases the population based on `popl_decr`.
+
+        Args:
+            rows (slice | numpy.ndarray): Rows of the groups.
+        """
+        self.popl[rows] -= self.popl_decr[rows]
+
+    def produce_food(self, rows):
+        """Produces food based on the circumstances of groups.
+
+        Args:
+            rows (slice | numpy.ndarray): Rows of the groups.
+        """
+        popl = self.popl[rows]
+        stpns = self.field.stpns.ravel()[self.cell[rows]]
+        food = popl/(self.diff[rows]*Group.FOOD_PROD_PARAM*stpns + EPSILON)
+        self.food[rows] += np.where(popl > 0, food, 0.0).astype(np.int64)
+
+    def perish(self, rows):
+        """Eliminates groups whose population is 0 or less.
+
+        Args:
+            rows (slice | numpy.ndarray): Rows of the groups.
+        """
+        dead = self.popl[rows] <= 0
+        self.alive[rows] &= ~dead
+        cells = self.cell[rows][dead]
+        self.rows[cells] = -1
+        self.field.dirty_cells.update(cells.tolist())
+
+    def reorder(self, parents):
+        """Drops perished groups and sorts the rest by population.
+
+        New groups are placed right after the group they came from before
+        sorting, and ties keep that order.
+
+        Args:
+            parents (numpy.ndarray): Rows that the new groups came from.
+        """
+        n_old = len(self) - len(parents)
+        positions = np.concatenate([
+            np.arange(n_old, dtype=np.float64), parents + 0.5])
+        rows = np.flatnonzero(self.alive)
+        rows = rows[np.lexsort((positions[rows], self.popl[rows]))]
+        for name in GroupTable.COLUMNS:
+            setattr(self, name, getattr(self, name)[rows])
+        self.rows[self.cell] = np.arange(len(rows))
+
+    def sync_groups(self, n_old):
+        """Writes the state of the rows to the objects of the groups.
+
+        Perished groups are removed from their cells, and objects are
+        created for new groups, which puts them on their cells.
+
+        Args:
+            n_old (int): Number of rows before the emigration. The rows that
+                follow them hold new groups.
+        """
+        for row in np.flatnonzero(~self.alive[:n_old]).tolist():
+            group = self.group[row]
+            group.alive = False
+            group.cell.group = None
+
+        # Rows of a copy, so that groups do not share the arrays of the table
+        characters = self.character.copy()
+        for row in range(n_old, len(self)):
+            self.group[row] = Group(
+                0, 0, characters[row], self.field.cell_at(self.cell[row]))
+
+        for group, popl, food, diff, character in zip(
+                self.group.tolist(), self.popl.tolist(), self.food.tolist(),
+                self.diff.tolist(), characters):
+            group.popl = popl
+            group.food = food
+            group.diff = diff
+            group.character = character
+
+    def update(self):
+        """Updates all groups' situation for a turn.
+
+        Returns:
+            out (tuple[int, int]): Number of groups founded and number of
+                groups perished.
+        """
+        timer = Group.timer
+        if timer is not None:
+            timer.start()
+
+        n_old = len(self)
+        self.popl_decr[:] = 0
+
+        self.mutate_character()
+        if timer is not None:
+            timer.lap("group.mutate")
+
+        self.consume_food()
+        if timer is not None:
+            timer.lap("group.consume")
+        parents = self.emigrate()
+        if timer is not None:
+            timer.lap("group.emigrate")
+        self.decrease_popl(slice(0, n_old))
+        self.produce_food(slice(0, n_old))
+
+        self.perish(slice(0, n_old))
+
+        # Character, difficulty and population have changed
+        self.field.dirty_cells.update(self.cell[:n_old].tolist())
+        self.sync_groups(n_old)
+        n_deaths = n_old - np.count_nonzero(self.alive[:n_old])
+        if timer is not None:
+            timer.lap("group.produce")
+
+        self.reorder(parents)
+        if timer is not None:
+            timer.lap("turn.sort")
+        return len(parents), int(n_deaths)
@@ -0,0 +1,277 @@
+"""Module for advancing simulations in a background thread."""
+
+import threading
+import time
+
+import numpy as np
+
+from src.civ.group import Group
+from src.clock import (
+    RateMeter,
+    TurnClock,
+)
+
+
+class GroupFrame:
+    """State of groups on every cell of a field, used for rendering.
+
+    A frame is written by a worker and then published to a viewer. Its
+    arrays are read-only while it is published.
+
+    Attributes:
+        turn (int): Turn of the simulation that this frame shows.
+        n_groups (int): Number of groups.
+        occupied (numpy.ndarray): Indicates if a group exists on each cell.
+        popl (numpy.ndarray): Population of the group on each cell.
+        diff (numpy.ndarray): Difficulty of the group on each cell.
+        character (numpy.ndarray): Character of the group on each cell shaped
+            (n_cells, 3).
+        dirty_cells (numpy.ndarray): Indices of cells whose group has changed
+            since the previous frame that was published.
+    """
+    ARRAYS = ("occupied", "popl", "diff", "character")
+
+    def __init__(self, field):
+        """State of groups on every cell of a field, used for rendering.
+
+        Args:
+            field (src.field.field.Field): Field that groups exist on.
+        """
+        self.turn = 0
+        self.n_groups = 0
+        self.occupied = np.zeros(field.n_cells, dtype=bool)
+        self.popl = np.zeros(field.n_cells, dtype=np.int64)
+        self.diff = np.zeros(field.n_cells, dtype=np.float64)
+        self.character = np.zeros(
+            (field.n_cells, Group.N_DIM_CHARACTER), dtype=np.float64)
+        self.dirty_cells = np.zeros(0, dtype=np.intp)
+
+    def set_writeable(self, writeable):
+        """Makes the arrays of this frame writeable or read-only.
+
+        Args:
+            writeable (bool): `True` to make them writeable.
+        """
+        for name in GroupFrame.ARRAYS:
+            getattr(self, name).flags.writeable = writeable
+        self.dirty_cells.flags.writeable = writeable
+
+    def write(self, field, indices):
+        """Copies the state of the groups on cells.
+
+        Args:
+            field (src.field.field.Field): Field that groups exist on.
+            indices (numpy.ndarray): Indices of the cells to copy.
+        """
+        group_ids = field.group_ids.ravel()[indices]
+        occupied = group_ids >= 0
+        self.occupied[indices] = occupied
+
+        empty = indices[~occupied]
+        self.popl[empty] = 0
+        self.diff[empty] = 0.0
+        self.character[empty] = 0.0
+
+        indices = indices[occupied]
+        if len(indices) == 0:
+            return
+        groups = [field.groups[group_id] for group_id in group_ids[occupied]]
+        self.popl[indices] = [group.popl for group in groups]
+        self.diff[indices] = [group.diff for group in groups]
+        self.character[indices] = [group.character for group in groups]
+
+
+class FrameBuffer:
+    """Double buffer of group frames shared by a worker and a viewer.
+
+    The worker writes a frame while the viewer renders the other one. A new
+    frame is published only after the viewer has taken the previous one, so
+    the viewer never misses the cells that have changed. Until then, the
+    worker keeps advancing turns and collects the changed cells.
+
+    Attributes:
+        frames (list[src.civ.worker.GroupFrame]): Two frames.
+        stale (list[numpy.ndarray]): Cells that each frame has to copy again
+            before it is published.
+        dirty (numpy.ndarray): Cells that have changed since the previous
+            frame was published.
+        latest (src.civ.worker.GroupFrame | None): Frame published and not
+            yet taken by the viewer.
+        held (src.civ.worker.GroupFrame | None): Frame taken by the viewer.
+        lock (threading.Lock): Lock for `latest` and `held`.
+    """
+
+    def __init__(self, field):
+        """Double buffer of group frames shared by a worker and a viewer.
+
+        Args:
+            field (src.field.field.Field): Field that groups exist on.
+        """
+        self.frames = [GroupFrame(field), GroupFrame(field)]
+        self.stale = [
+            np.ones(field.n_cells, dtype=bool),
+            np.ones(field.n_cells, dtype=bool)]
+        self.dirty = np.ones(field.n_cells, dtype=bool)
+        self.latest = None
+        self.held = None
+        self.lock = threading.Lock()
+
+    def publish(self, simulation, dirty_cells):
+        """Publishes the state of a simulation if the viewer is ready.
+
+        This method is called by the worker after every turn.
+
+        Args:
+            simulation (src.civ.simulation.Simulation): Simulation.
+            dirty_cells (numpy.ndarray): Indices of cells whose group has
+                changed in the turn.
+
+        Returns:
+            out (bool): `True` if a frame has been published.
+        """
+        for stale in self.stale:
+            stale[dirty_cells] = True
+        self.dirty[dirty_cells] = True
+        with self.lock:
+            if self.latest is not None:
+                # The viewer has not taken the previous frame yet
+                return False
+            k = 1 if self.frames[0] is self.held else 0
+
+        # Neither the viewer nor the mailbox refers to this frame
+        frame = self.frames[k]
+        frame.set_writeable(True)
+        frame.write(simulation.field, np.flatnonzero(self.stale[k]))
+        frame.turn = simulation.turn
+        frame.n_groups = len(simulation.groups)
+        frame.dirty_cells = np.flatnonzero(self.dirty)
+        frame.set_writeable(False)
+        self.stale[k][:] = False
+        self.dirty[:] = False
+
+        with self.lock:
+            self.latest = frame
+        return True
+
+    def take(self):
+        """Takes the latest frame. This method is called by the viewer.
+
+        The frame taken before is released, and must not be used anymore.
+
+        Returns:
+            out (src.civ.worker.GroupFrame | None): Latest frame. None if no
+                frames have been published since the last call.
+        """
+        with self.lock:
+            frame = self.latest
+            if frame is None:
+                return None
+            self.latest = None
+            self.held = frame
+        return frame
+
+
+class SimulationWorker(threading.Thread):
+    """Thread that advances a simulation at the rate of a turn clock.
+
+    Attributes:
+        simulation (src.civ.simulation.Simulation): Simulation to advance.
+        frame_buffer (src.civ.worker.FrameBuffer): Buffer that frames are
+            published to.
+        turn_clock (src.clock.TurnClock): Clock that paces turns.
+        turn_meter (src.clock.RateMeter): Meter of the achieved turn rate.
+        profile_capture (src.profiling.ProfileCapture | None): Capture of
+            profiles around turns.
+        error (BaseException | None): Exception that stopped this thread.
+    """
+    IDLE_SLEEP_MAX = 0.01  # s
+
+    def __init__(self, simulation, turn_clock=None, profile_capture=None):
+        """Thread that advances a simulation at the rate of a turn clock.
+
+        Args:
+            simulation (src.civ.simulation.Simulation): Simulation to
+                advance.
+            turn_clock (src.clock.TurnClock | None): Clock that paces turns.
+                If `None`, a clock with the default rate is used.
+            profile_capture (src.profiling.ProfileCapture | None): Capture
+                of profiles around turns. It runs in this thread, so that
+                the turns are profiled rather than the viewer.
+        """
+        super().__init__(daemon=True)
+        self.simulation = simulation
+        self.frame_buffer = FrameBuffer(simulation.field)
+        self.turn_clock = TurnClock() if turn_clock is None else turn_clock
+        self.turn_meter = RateMeter()
+        self.profile_capture = profile_capture
+        self.error = None
+        self._stop_event = threading.Event()
+        self._timer_lock = threading.Lock()
+        self._timer_request = None
+
+        # The initial state
+        self.frame_buffer.publish(
+            simulation, simulation.field.take_dirty_cells())
+
+    def run(self):
+        capture = self.profile_capture
+        try:
+            time_prev = time.perf_counter()
+            while not self._stop_event.is_set():
+                time_curr = time.perf_counter()
+                self.turn_clock.tick(time_curr - time_prev)
+                time_prev = time_curr
+                if not self.turn_clock.take_turn():
+                    self.turn_meter.update()
+                    self.wait_for_turn()
+                    continue
+                self.apply_timer_request()
+                if capture is not None:
+                    capture.before_turn(self.simulation.turn)
+                self.simulation.step()
+                if capture is not None:
+                    capture.after_turn(self.simulation.turn)
+                self.frame_buffer.publish(
+                    self.simulation,
+                    self.simulation.field.take_dirty_cells())
+                self.turn_meter.count()
+            if capture is not None:
+                capture.close(self.simulation.turn)
+        except BaseException as e:
+            self.error = e
+
+    def request_timer(self, timer):
+        """Requests to set the timer of turns before the next turn.
+
+        The timer is not set right away, since this is called from another
+        thread while a turn may be running, and the turn would be partly
+        timed.
+
+        Args:
+            timer (src.timing.PhaseTimer | None): Timer of turns. If `None`,
+                turns are no longer timed.
+        """
+        with self._timer_lock:
+            self._timer_request = (timer,)
+
+    def apply_timer_request(self):
+        """Sets the requested timer of turns, if any, between turns."""
+        with self._timer_lock:
+            request = self._timer_request
+            self._timer_request = None
+        if request is not None:
+            self.simulation.set_timer(request[0])
+
+    def wait_for_turn(self):
+        """Sleeps until the next turn is due."""
+        clock = self.turn_clock
+        sleep = SimulationWorker.IDLE_SLEEP_MAX
+        if not clock.paused:
+            sleep = min(sleep, (1.0 - clock.backlog)/clock.turns_per_sec)
+        self._stop_event.wait(max(sleep, 0.0))
+
+    def stop(self):
+        """Stops this thread and waits for it to finish."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
@@ -0,0 +1,95 @@
+"""Module for pacing simulations and measuring rates."""
+
+import time
+
+
+class TurnClock:
+    """Clock that tells how many turns are due at a fixed simulation rate.
+
+    Elapsed time is accumulated as a backlog of turns. Turns are taken from
+    the backlog one by one, so several turns run in a frame when frames are
+    slow, and none run in a frame when they are fast.
+
+    Attributes:
+        turns_per_sec (float): Simulation rate.
+        max_backlog (float): Maximum number of turns that can be due at once.
+            Turns beyond it are dropped, so the simulation slows down instead
+            of falling further behind.
+        backlog (float): Number of turns that are due.
+        paused (bool): Indicates if the clock is paused.
+    """
+
+    def __init__(self, turns_per_sec=60.0, max_backlog=1000.0):
+        """Clock that tells how many turns are due at a fixed simulation rate.
+
+        Args:
+            turns_per_sec (float): Simulation rate.
+            max_backlog (float): Maximum number of turns that can be due at
+                once.
+        """
+        self.turns_per_sec = turns_per_sec
+        self.max_backlog = max_backlog
+        self.backlog = 0.0
+        self.paused = False
+
+    def tick(self, dt):
+        """Advances the clock.
+
+        Args:
+            dt (float): Elapsed time (s).
+        """
+        if self.paused:
+            return
+        self.backlog = min(
+            self.backlog + dt*self.turns_per_sec, self.max_backlog)
+
+    def take_turn(self):
+        """Takes a turn from the backlog.
+
+        Returns:
+            out (bool): `True` if a turn is due.
+        """
+        if self.backlog < 1.0:
+            return False
+        self.backlog -= 1.0
+        return True
+
+
+class RateMeter:
+    """Meter that measures the rate of events, such as turns or frames.
+
+    Attributes:
+        window (float): Time over which events are counted (s).
+        rate (float): Number of events per second in the last window.
+        n_events (int): Number of events in the current window.
+        time_start (float): Start time of the current window (s).
+    """
+
+    def __init__(self, window=1.0):
+        """Meter that measures the rate of events.
+
+        Args:
+            window (float): Time over which events are counted (s).
+        """
+        self.window = window
+        self.rate = 0.0
+        self.n_events = 0
+        self.time_start = time.perf_counter()
+
+    def count(self, n=1):
+        """Counts events.
+
+        Args:
+            n (int): Number of events.
+        """
+        self.n_events += n
+        self.update()
+
+    def update(self):
+        """Updates the rate if the current window has passed."""
+        now = time.perf_counter()
+        elapsed = now - self.time_start
+        if elapsed >= self.window:
+            self.rate = self.n_events/elapsed
+            self.n_events = 0
+            self.time_start = now
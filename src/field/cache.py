@@ -0,0 +1,192 @@
+"""Module for caching generated terrain on disk."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import src.field
+import src.field.terrain
+from src.field.terrain import generate_terrain
+
+TERRAIN_CACHE_VERSION = 3
+
+TERRAIN_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__)))), ".cache", "terrain")
+TERRAIN_CACHE_MAX_BYTES = 1024**3  # B
+
+TERRAIN_ARRAYS = (
+    "elevs", "stpns", "surfaces", "labels", "land_dists", "nearest_lands")
+TERRAIN_TABLES = ("label_sizes", "label_surfaces", "label_bboxes")
+
+
+def calc_terrain_key(seed, compat, config):
+    """Calculates the cache key of terrain.
+
+    The key is a hash of the seed, the field configuration and every
+    parameter in `src.field` and `src.field.terrain` that the generated
+    terrain depends on.
+
+    Args:
+        seed (int): Seed value for terrain generation.
+        compat (bool): Compatibility mode of terrain generation.
+        config (src.field.config.FieldConfig): Configuration of the field.
+
+    Returns:
+        out (str): Cache key.
+    """
+    params = {
+        "version": TERRAIN_CACHE_VERSION,
+        "seed": seed,
+        "compat": compat,
+        "config": config.to_dict(),
+    }
+    for module in (src.field, src.field.terrain):
+        for name, value in vars(module).items():
+            if name.startswith(("FIELD_", "CELL_")):
+                # Superseded by the configuration of the field
+                continue
+            if name.isupper() and isinstance(value, (int, float)):
+                params[f"{module.__name__}.{name}"] = value
+    text = json.dumps(params, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TerrainCache:
+    """Cache of generated terrain on disk.
+
+    Every entry is a directory named after its key, holding the terrain
+    arrays and the component tables of a field as `.npy` files. The total
+    size of entries is kept under `max_bytes` by evicting the least recently
+    used ones.
+
+    Attributes:
+        directory (str): Directory where entries are stored.
+        max_bytes (int): Maximum total size of entries (B).
+    """
+
+    def __init__(self, directory=TERRAIN_CACHE_DIR,
+                 max_bytes=TERRAIN_CACHE_MAX_BYTES):
+        """Cache of generated terrain on disk.
+
+        Args:
+            directory (str): Directory where entries are stored.
+            max_bytes (int): Maximum total size of entries (B).
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def entry_path(self, key):
+        """Gets the path to an entry.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            out (str): Path to the entry directory.
+        """
+        return os.path.join(self.directory, key)
+
+    def load(self, field, key):
+        """Loads terrain onto a field.
+
+        Arrays are memory-mapped in copy-on-write mode, so modifying them does
+        not change the cache.
+
+        Args:
+            field (src.field.field.Field): Field to load terrain onto.
+            key (str): Cache key.
+
+        Returns:
+            out (bool): `True` if the entry exists and has been loaded.
+        """
+        path = self.entry_path(key)
+        arrays = {}
+        for name in TERRAIN_ARRAYS + TERRAIN_TABLES:
+            file_path = os.path.join(path, f"{name}.npy")
+            try:
+                array = np.load(file_path, mmap_mode="c")
+            except (OSError, ValueError):
+                return False
+            if (name in TERRAIN_ARRAYS
+                    and array.shape[:2] != (field.height, field.width)):
+                return False
+            arrays[name] = array
+        for name, array in arrays.items():
+            setattr(field, name, array)
+
+        # Mark the entry as recently used
+        os.utime(path)
+        return True
+
+    def save(self, field, key):
+        """Saves the terrain of a field.
+
+        Args:
+            field (src.field.field.Field): Field to save the terrain of.
+            key (str): Cache key.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+        try:
+            for name in TERRAIN_ARRAYS + TERRAIN_TABLES:
+                np.save(
+                    os.path.join(temp_path, f"{name}.npy"),
+                    getattr(field, name))
+            path = self.entry_path(key)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(temp_path, path)
+        except OSError:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """Evicts the least recently used entries to bound the total size.
+
+        Args:
+            keep (str | None): Key of an entry that must not be evicted.
+        """
+        entries = []
+        total_bytes = 0
+        for key in os.listdir(self.directory):
+            path = self.entry_path(key)
+            if key.startswith(".") or not os.path.isdir(path):
+                continue
+            n_bytes = sum(
+                entry.stat().st_size for entry in os.scandir(path))
+            entries.append((os.stat(path).st_mtime, key, n_bytes))
+            total_bytes += n_bytes
+        entries.sort()
+        for _, key, n_bytes in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+            total_bytes -= n_bytes
+
+
+def generate_terrain_with_cache(field, seed, cache, compat=True):
+    """Generates terrain on a field, or loads it if it has been cached.
+
+    Args:
+        field (src.field.field.Field): Field to generate terrain on.
+        seed (int): Seed value for terrain generation.
+        cache (src.field.cache.TerrainCache | None): Terrain cache. If `None`,
+            terrain is always generated.
+        compat (bool): Compatibility mode of terrain generation. See
+            `src.field.terrain.generate_terrain()`.
+    """
+    if cache is None:
+        generate_terrain(field, seed, compat)
+        return
+    key = calc_terrain_key(seed, compat, field.config)
+    if cache.load(field, key):
+        return
+    generate_terrain(field, seed, compat)
+    cache.save(field, key)
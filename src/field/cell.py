@@ -1,20 +1,24 @@
 """Module for cells that compose a simulation field."""
 
-import numpy as np
-
-from src.field import CELL_COORD_SCALE
-
 
 class Cell:
     """Hexagonal cell that composes a field.
 
+    A cell does not hold its own state. It is a lightweight view into the
+    arrays of the field it belongs to, so cells can be created on demand and
+    two cells are equal if they refer to the same location on the same field.
+
     Attributes:
+        field (src.field.field.Field): Field that this cell belongs to.
         row (int): Row number where this cell is located on the field.
         col (int): Column number where this cell is located on the field.
+        index (int): Index of this cell in the flattened arrays of the field.
         pos (numpy.ndarray): Position of this cell.
         coord (numpy.ndarray): Coordinate of this cell. Reflects the actual
             scale.
         neighborhood (list[src.field.cell.Cell]): List of neighbor cells.
+            Setting it overrides the neighbors in the field's neighbor table
+            (e.g. for small experiments on a few cells).
         elev (float): Elevation (m).
         stpn (float): Steepness. Mean elevation gradient with neighbor cells. A
             steepness of 1.0 is defined as a vertical distance of 1 meter for
@@ -25,25 +29,98 @@ class Cell:
     SURFACE_SEA = 0
     SURFACE_LAND = 1
 
-    def __init__(self, row, col):
+    __slots__ = ("field", "row", "col", "index")
+
+    def __init__(self, field, row, col):
         """Hexagonal cell that composes a field.
 
         Args:
+            field (src.field.field.Field): Field that this cell belongs to.
             row (int): Row number where this cell is located on the field.
             col (int): Column number where this cell is located on the field.
         """
+        self.field = field
         self.row = row
         self.col = col
+        self.index = row*field.width + col
+
+    def __eq__(self, other):
+        if not isinstance(other, Cell):
+            return NotImplemented
+        return self.field is other.field and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.field), self.index))
+
+    def __repr__(self):
+        return f"Cell(row={self.row}, col={self.col})"
+
+    @property
+    def pos(self):
+        return self.field.positions[self.row, self.col]
+
+    @property
+    def coord(self):
+        return self.field.coords[self.row, self.col]
+
+    @property
+    def neighborhood(self):
+        indices = self.field.neighbor_indices[self.row, self.col]
+        mask = self.field.neighbor_mask[self.row, self.col]
+        return [self.field.cell_at(index) for index in indices[mask]]
+
+    @neighborhood.setter
+    def neighborhood(self, cells):
+        if len(cells) > 6:
+            raise ValueError(f"too many neighbors: {len(cells)}")
+        indices = self.field.neighbor_indices[self.row, self.col]
+        mask = self.field.neighbor_mask[self.row, self.col]
+        # Missing slots refer to the cell itself, as the field's do
+        indices[:] = self.index
+        indices[:len(cells)] = [cell.index for cell in cells]
+        mask[:] = False
+        mask[:len(cells)] = True
+        self.field.n_neighbors[self.row, self.col] = len(cells)
+
+    @property
+    def elev(self):
+        return self.field.elevs[self.row, self.col]
+
+    @elev.setter
+    def elev(self, value):
+        self.field.elevs[self.row, self.col] = value
+
+    @property
+    def stpn(self):
+        return self.field.stpns[self.row, self.col]
 
-        self.pos = np.array(
-            [self.col + (self.row % 2)/2, self.row], dtype=np.float64)
-        self.coord = CELL_COORD_SCALE*self.pos
+    @stpn.setter
+    def stpn(self, value):
+        self.field.stpns[self.row, self.col] = value
 
-        self.neighborhood = []
+    @property
+    def surface(self):
+        return int(self.field.surfaces[self.row, self.col])
 
-        self.elev = 0.0  # m
-        self.stpn = 0.0
+    @surface.setter
+    def surface(self, value):
+        self.field.surfaces[self.row, self.col] = value
 
-        self.surface = Cell.SURFACE_SEA
+    @property
+    def group(self):
+        group_id = self.field.group_ids[self.row, self.col]
+        if group_id < 0:
+            return None
+        return self.field.groups[group_id]
 
-        self.group = None
+    @group.setter
+    def group(self, group):
+        group_id = self.field.group_ids[self.row, self.col]
+        if group_id >= 0:
+            del self.field.groups[group_id]
+        if group is None:
+            self.field.group_ids[self.row, self.col] = -1
+        else:
+            self.field.groups[group.id] = group
+            self.field.group_ids[self.row, self.col] = group.id
+        self.field.dirty_cells.add(self.index)
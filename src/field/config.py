@@ -0,0 +1,84 @@
+"""Module for the configuration of a simulation field."""
+
+import math
+
+import numpy as np
+
+from src.field import (
+    FIELD_BASE_HEIGHT,
+    FIELD_BASE_WIDTH,
+    FIELD_CIRCUMFERENCE,
+    FIELD_SCALE,
+)
+
+
+class FieldConfig:
+    """Configuration of a field and the geometry derived from it.
+
+    Attributes:
+        scale (int): Scale of terrain simplicity. Must be a power of 2.
+        base_width (int): Width of the field in units of `scale`.
+        base_height (int): Height of the field in units of `scale`.
+        circumference (float): Circumference of the world (km).
+        width (int): Number of columns in the cell array.
+        height (int): Number of rows in the cell array.
+        cell_diameter (float): Distance from the center of a (hexagonal) cell
+            to a vertex (m).
+        cell_distance (float): Distance between the centers of adjacent cells
+            (m).
+        cell_coord_scale (numpy.ndarray): Scale from cells' positions to their
+            coordinates (m).
+        coord_x_max (float): Width of the field in the coordinate (m).
+    """
+
+    def __init__(self, scale=FIELD_SCALE, base_width=FIELD_BASE_WIDTH,
+                 base_height=FIELD_BASE_HEIGHT,
+                 circumference=FIELD_CIRCUMFERENCE):
+        """Configuration of a field and the geometry derived from it.
+
+        Args:
+            scale (int): Scale of terrain simplicity. Must be a power of 2.
+            base_width (int): Width of the field in units of `scale`.
+            base_height (int): Height of the field in units of `scale`.
+            circumference (float): Circumference of the world (km).
+        """
+        if scale < 2 or scale & (scale - 1) != 0:
+            raise ValueError(f"scale must be a power of 2: {scale}")
+
+        self.scale = scale
+        self.base_width = base_width
+        self.base_height = base_height
+        self.circumference = circumference
+
+        self.width = scale*base_width
+        self.height = scale*base_height + 1
+
+        self.cell_diameter = 1000*4/3*circumference/(2*self.height - 1)  # m
+        self.cell_distance = math.sqrt(3)/2*self.cell_diameter  # m
+        self.cell_coord_scale = np.array(
+            [self.cell_distance, 3/4*self.cell_diameter],
+            dtype=np.float64)  # m
+        self.coord_x_max = self.cell_distance*self.width  # m
+
+    def __repr__(self):
+        return (
+            f"FieldConfig(scale={self.scale}, base_width={self.base_width}, "
+            f"base_height={self.base_height}, "
+            f"circumference={self.circumference})")
+
+    @property
+    def n_cells(self):
+        return self.width*self.height
+
+    def to_dict(self):
+        """Converts this configuration to a dictionary.
+
+        Returns:
+            out (dict[str, int | float]): Parameters of this configuration.
+        """
+        return {
+            "scale": self.scale,
+            "base_width": self.base_width,
+            "base_height": self.base_height,
+            "circumference": self.circumference,
+        }
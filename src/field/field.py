@@ -1,65 +1,318 @@
 """Module for a simulation field."""
 
-import itertools
+import numpy as np
 
-from src.field import (
-    FIELD_HEIGHT,
-    FIELD_SCALE,
-    FIELD_WIDTH,
-)
 from src.field.cell import Cell
+from src.field.config import FieldConfig
+
+
+class CellRow:
+    """Row of cells on a field. Cells are created when they are accessed.
+
+    Attributes:
+        field (src.field.field.Field): Field that this row belongs to.
+        row (int): Row number on the field.
+    """
+    __slots__ = ("field", "row")
+
+    def __init__(self, field, row):
+        """Row of cells on a field.
+
+        Args:
+            field (src.field.field.Field): Field that this row belongs to.
+            row (int): Row number on the field.
+        """
+        self.field = field
+        self.row = row
+
+    def __len__(self):
+        return self.field.width
+
+    def __getitem__(self, col):
+        cols = range(self.field.width)[col]
+        if isinstance(cols, range):
+            return [Cell(self.field, self.row, c) for c in cols]
+        return Cell(self.field, self.row, cols)
+
+    def __iter__(self):
+        for col in range(self.field.width):
+            yield Cell(self.field, self.row, col)
 
 
 class Field:
     """Field which simulations are performed on.
 
+    The state of cells is stored as arrays shaped (height, width), and
+    `src.field.cell.Cell` is a view into them.
+
     Attributes:
+        config (src.field.config.FieldConfig): Configuration of this field.
         scale (int): Scale of terrain simplicity. The greater this value is,
             the simpler the terrain becomes.
         width (int): Number of rows in the cell array.
         height (int): Number of columns in the cell array.
-        cells (list[list[src.field.cell.Cell]]): 2D array of cells.
+        positions (numpy.ndarray): Positions of cells. Shaped (height, width,
+            2). Computed when it is accessed for the first time.
+        coords (numpy.ndarray): Coordinates of cells. Reflects the actual
+            scale. Shaped (height, width, 2). Computed when it is accessed
+            for the first time.
+        elevs (numpy.ndarray): Elevation of cells (m).
+        stpns (numpy.ndarray): Steepness of cells.
+        surfaces (numpy.ndarray): State of cells' surface.
+        labels (numpy.ndarray): Label of the connected component of land or
+            sea cells that each cell belongs to.
+        label_sizes (numpy.ndarray): Number of cells in each component.
+        label_surfaces (numpy.ndarray): State of the surface of each
+            component.
+        label_bboxes (numpy.ndarray): Bounding box of each component as rows
+            of (row_min, col_min, row_max, col_max). `col_max` exceeds the
+            last column if the box wraps around the east-west edge.
+        land_dists (numpy.ndarray): Number of hops from each cell to the
+            nearest land cell. 0 on land cells, and -1 if there is no land
+            or they have not been calculated, such as when surfaces are set
+            by hand.
+        nearest_lands (numpy.ndarray): Index of one of the nearest land cells
+            to each cell. -1 if there is no land. The label of its landmass
+            is `labels.flat[nearest_lands]`.
+        group_ids (numpy.ndarray): ID of the group that exists on each cell.
+            -1 if no groups exist on the cell.
+        groups (dict[int, src.civ.group.Group]): Groups that exist on this
+            field, keyed by their ID.
+        dirty_cells (set[int]): Indices of cells whose group has changed
+            since the last call of `take_dirty_cells()`, including cells
+            where groups were born or perished.
+        neighbor_indices (numpy.ndarray): Indices of every cell's neighbor
+            cells in the flattened arrays. Shaped (height, width, 6).
+        neighbor_mask (numpy.ndarray): Indicates which slots in
+            `neighbor_indices` refer to actual neighbors.
+        n_neighbors (numpy.ndarray): Number of every cell's neighbors.
+        cells (list[src.field.field.CellRow]): 2D array of cells.
     """
 
-    def __init__(self):
-        """Field which simulations are performed on."""
-        self.scale = FIELD_SCALE
-        self.width = FIELD_WIDTH
-        self.height = FIELD_HEIGHT
-
-        self.cells = []
-        for row in range(self.height):
-            temp_cells = []
-            for col in range(self.width):
-                cell = Cell(row, col)
-                temp_cells.append(cell)
-            self.cells.append(temp_cells)
+    def __init__(self, config=None):
+        """Field which simulations are performed on.
+
+        Args:
+            config (src.field.config.FieldConfig | None): Configuration of the
+                field. If `None`, the default configuration is used.
+        """
+        self.config = FieldConfig() if config is None else config
+        self.scale = self.config.scale
+        self.width = self.config.width
+        self.height = self.config.height
+
+        self._positions = None
+        self._coords = None
+
+        shape = (self.height, self.width)
+        self.elevs = np.zeros(shape, dtype=np.float64)  # m
+        self.stpns = np.zeros(shape, dtype=np.float64)
+        self.surfaces = np.full(shape, Cell.SURFACE_SEA, dtype=np.int8)
+        self.labels = np.zeros(shape, dtype=np.int32)
+        self.label_sizes = np.array([self.n_cells], dtype=np.int64)
+        self.label_surfaces = np.array([Cell.SURFACE_SEA], dtype=np.int8)
+        self.label_bboxes = np.array(
+            [[0, 0, self.height - 1, self.width - 1]], dtype=np.int32)
+        self.land_dists = np.full(shape, -1, dtype=np.int32)
+        self.nearest_lands = np.full(shape, -1, dtype=np.int32)
+
+        self.group_ids = np.full(shape, -1, dtype=np.int32)
+        self.groups = {}
+        self.dirty_cells = set()
+
         self.init_neighborhood_of_cells()
 
+        self.cells = [CellRow(self, row) for row in range(self.height)]
+
+    @property
+    def n_cells(self):
+        return self.width*self.height
+
+    @property
+    def positions(self):
+        if self._positions is None:
+            rows = np.arange(self.height, dtype=np.float64)[:, np.newaxis]
+            cols = np.arange(self.width, dtype=np.float64)[np.newaxis, :]
+            positions = np.empty(
+                (self.height, self.width, 2), dtype=np.float64)
+            positions[..., 0] = cols + (rows % 2)/2
+            positions[..., 1] = rows
+            self._positions = positions
+        return self._positions
+
+    @property
+    def coords(self):
+        if self._coords is None:
+            self._coords = self.config.cell_coord_scale*self.positions
+        return self._coords
+
+    def cell_at(self, index):
+        """Gets a cell from its index in the flattened arrays.
+
+        Args:
+            index (int): Index of the cell.
+
+        Returns:
+            out (src.field.cell.Cell): Cell at the index.
+        """
+        row, col = divmod(int(index), self.width)
+        return Cell(self, row, col)
+
+    def calc_axial_coords(self, coords):
+        """Calculates the axial coordinates of the cells containing points.
+
+        Axial coordinates (q, r) are integers where r is the row and q
+        increases by 1 toward the east and by 1/2 toward the south-west. The
+        x-coordinate is not wrapped, and the row may be out of the field.
+
+        Args:
+            coords (numpy.ndarray): Coordinates of points (m). Shaped (..., 2).
+
+        Returns:
+            out (tuple[numpy.ndarray, numpy.ndarray]): q and r of the cells.
+        """
+        coords = np.asarray(coords, dtype=np.float64)
+        positions = coords/self.config.cell_coord_scale
+        r = positions[..., 1]
+        q = positions[..., 0] - r/2
+        s = -q - r
+
+        # Round to the nearest cell in the cube coordinates
+        q_round, r_round, s_round = np.rint(q), np.rint(r), np.rint(s)
+        q_diff = np.abs(q_round - q)
+        r_diff = np.abs(r_round - r)
+        s_diff = np.abs(s_round - s)
+        fix_q = (q_diff > r_diff) & (q_diff > s_diff)
+        fix_r = ~fix_q & (r_diff > s_diff)
+        q_round = np.where(fix_q, -r_round - s_round, q_round)
+        r_round = np.where(fix_r, -q_round - s_round, r_round)
+        return q_round.astype(np.int64), r_round.astype(np.int64)
+
+    def indices_at(self, coords):
+        """Gets the indices of the cells containing points.
+
+        The x-coordinate wraps around at `config.coord_x_max`, and points
+        beyond the north and south ends belong to the nearest cells in the
+        end rows.
+
+        Args:
+            coords (numpy.ndarray): Coordinates of points (m). Shaped (..., 2).
+
+        Returns:
+            out (numpy.ndarray): Indices of the cells in the flattened arrays.
+        """
+        coords = np.asarray(coords, dtype=np.float64)
+        q, rows = self.calc_axial_coords(coords)
+        cols = q + rows//2
+
+        # Points beyond the ends of the field
+        outside = (rows < 0) | (rows >= self.height)
+        if np.any(outside):
+            rows = np.clip(rows, 0, self.height - 1)
+            x = coords[..., 0]/self.config.cell_distance
+            cols = np.where(
+                outside, np.rint(x - (rows % 2)/2).astype(np.int64), cols)
+
+        return rows*self.width + cols % self.width
+
+    def trace_line(self, coord_start, coord_end):
+        """Traces the cells on the line between the cells containing points.
+
+        The line connects the centers of the cells containing the start and
+        end points, taking the shorter way around the east-west wrap.
+        Consecutive cells in the result are adjacent to each other unless the
+        line goes beyond the north or south end of the field.
+
+        Args:
+            coord_start (numpy.ndarray): Coordinate of the start point (m).
+            coord_end (numpy.ndarray): Coordinate of the end point (m).
+
+        Returns:
+            out (numpy.ndarray): Indices of the cells from the one containing
+                the start point to the one containing the end point.
+        """
+        coord_start = np.asarray(coord_start, dtype=np.float64)
+        delta = np.asarray(coord_end, dtype=np.float64) - coord_start
+        x_max = self.config.coord_x_max
+        delta[0] = (delta[0] + x_max/2) % x_max - x_max/2
+
+        q, r = self.calc_axial_coords(
+            np.stack([coord_start, coord_start + delta]))
+        dq, dr = q[1] - q[0], r[1] - r[0]
+        n_steps = (abs(dq) + abs(dr) + abs(dq + dr))//2
+
+        # Sample a point per step between the centers. The points are nudged
+        # so that they do not fall on the edges between cells.
+        ts = np.arange(n_steps + 1)/max(n_steps, 1)
+        q_samples = q[0] + 1e-6 + ts*dq
+        r_samples = r[0] + 2e-6 + ts*dr
+        positions = np.stack([q_samples + r_samples/2, r_samples], axis=-1)
+        indices = self.indices_at(positions*self.config.cell_coord_scale)
+
+        # Cells repeat where the line goes beyond the ends
+        keep = np.ones(len(indices), dtype=bool)
+        keep[1:] = indices[1:] != indices[:-1]
+        return indices[keep]
+
+    def take_dirty_cells(self):
+        """Takes the indices of dirty cells and resets them.
+
+        Returns:
+            out (numpy.ndarray): Indices of the cells whose group has changed.
+        """
+        indices = np.fromiter(
+            self.dirty_cells, dtype=np.intp, count=len(self.dirty_cells))
+        self.dirty_cells.clear()
+        return indices
+
     def init_neighborhood_of_cells(self):
-        """Initializes every cell's neighborhood."""
-        for cell in itertools.chain.from_iterable(self.cells):
-            cell.neighborhood.clear()
-            r, c = cell.row, cell.col
-            if r >= 1:
-                if r % 2 == 0:
-                    cell_1 = self.cells[r - 1][(c - 1) % self.width]
-                    cell_2 = self.cells[r - 1][c]
-                else:
-                    cell_1 = self.cells[r - 1][c]
-                    cell_2 = self.cells[r - 1][(c + 1) % self.width]
-                cell.neighborhood.append(cell_1)
-                cell.neighborhood.append(cell_2)
-            cell_3 = self.cells[r][(c - 1) % self.width]
-            cell_4 = self.cells[r][(c + 1) % self.width]
-            cell.neighborhood.append(cell_3)
-            cell.neighborhood.append(cell_4)
-            if r <= self.height - 2:
-                if r % 2 == 0:
-                    cell_5 = self.cells[r + 1][(c - 1) % self.width]
-                    cell_6 = self.cells[r + 1][c]
-                else:
-                    cell_5 = self.cells[r + 1][c]
-                    cell_6 = self.cells[r + 1][(c + 1) % self.width]
-                cell.neighborhood.append(cell_5)
-                cell.neighborhood.append(cell_6)
+        """Initializes every cell's neighborhood.
+
+        Neighbors are stored in the order of north-west, north-east, west,
+        east, south-west and south-east. Cells in the north and south ends
+        have only 4 neighbors, and their missing slots refer to the cell
+        itself and are masked out.
+        """
+        rows = np.arange(self.height, dtype=np.int32)[:, np.newaxis]
+        cols = np.arange(self.width, dtype=np.int32)[np.newaxis, :]
+
+        # Columns of the neighbors in the adjacent rows
+        cols_w = (cols - 1 + rows % 2) % self.width
+        cols_e = (cols + rows % 2) % self.width
+
+        rows_n = np.maximum(rows - 1, 0)
+        rows_s = np.minimum(rows + 1, self.height - 1)
+
+        indices = np.empty((self.height, self.width, 6), dtype=np.int32)
+        indices[..., 0] = rows_n*self.width + cols_w
+        indices[..., 1] = rows_n*self.width + cols_e
+        indices[..., 2] = rows*self.width + (cols - 1) % self.width
+        indices[..., 3] = rows*self.width + (cols + 1) % self.width
+        indices[..., 4] = rows_s*self.width + cols_w
+        indices[..., 5] = rows_s*self.width + cols_e
+
+        mask = np.ones(indices.shape, dtype=bool)
+        mask[0, :, 0:2] = False
+        mask[-1, :, 4:6] = False
+
+        # Missing slots refer to the cell itself
+        indices[0, :, 0:2] = cols.T
+        indices[-1, :, 4:6] = (self.height - 1)*self.width + cols.T
+
+        self.neighbor_indices = indices
+        self.neighbor_mask = mask
+        self.n_neighbors = mask.sum(axis=-1, dtype=np.int8)
+
+    def gather_neighbors(self, values):
+        """Gathers the values of every cell's neighbors.
+
+        Args:
+            values (numpy.ndarray): Values of cells. Shaped (height, width,
+                ...).
+
+        Returns:
+            out (numpy.ndarray): Values of neighbors. Shaped (height, width,
+                6, ...). Values in masked slots are those of the cell itself.
+        """
+        flat_values = values.reshape((self.n_cells,) + values.shape[2:])
+        return flat_values[self.neighbor_indices]
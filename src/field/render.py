@@ -1,6 +1,5 @@
 """Module for rendering a simulation field."""
 
-import itertools
 import math
 
 import matplotlib.cm as cm
@@ -29,6 +28,103 @@ RENDER_ELEV_LAND_COLOR_MAX = 255.0
 
 RENDER_STPN_MAX = 0.005
 
+RENDER_LAND_DIST_MAX = 16
+
+RENDER_COLORMAP_SIZE = 256
+
+
+def levels_to_colors(levels):
+    """Converts monochrome color levels to colors.
+
+    Args:
+        levels (numpy.ndarray): Monochrome color levels.
+
+    Returns:
+        out (numpy.ndarray): Colors (RGBA) shaped (..., 4).
+    """
+    colors = np.empty(levels.shape + (4,), dtype=np.uint8)
+    colors[..., 0:3] = levels[..., np.newaxis]
+    colors[..., 3] = 255
+    return colors
+
+
+def create_colormap_lut(colormap):
+    """Creates a lookup table of a colormap.
+
+    Args:
+        colormap (matplotlib.colors.Colormap): Colormap.
+
+    Returns:
+        out (numpy.ndarray): Colors (RGBA) shaped (RENDER_COLORMAP_SIZE, 4).
+    """
+    colors = 255.0*colormap(np.arange(RENDER_COLORMAP_SIZE))
+    return colors.astype(np.uint8)
+
+
+def create_elev_land_lut():
+    """Creates a lookup table of land colors for every elevation step.
+
+    Returns:
+        out (numpy.ndarray): Colors (RGBA) shaped (n_steps, 4).
+    """
+    levels = []
+    for step in range(int(RENDER_ELEV_LAND_MAX_STEP) + 1):
+        levels.append(float(int(
+            (RENDER_ELEV_LAND_COLOR_MAX - RENDER_ELEV_LAND_COLOR_MIN)
+            /math.pow(RENDER_ELEV_LAND_MAX_STEP, 3)*math.pow(step, 3)
+                + RENDER_ELEV_LAND_COLOR_MIN)))
+    return levels_to_colors(np.array(levels, dtype=np.float64))
+
+
+RENDER_VIRIDIS_LUT = create_colormap_lut(cm.viridis)
+
+RENDER_ELEV_SEA_LUT = levels_to_colors(np.array(
+    [RENDER_ELEV_SEA_COLOR_DEEP, RENDER_ELEV_SEA_COLOR_SHALLOW],
+    dtype=np.float64))
+RENDER_ELEV_LAND_LUT = create_elev_land_lut()
+
+
+def calc_colormap_indices(x):
+    """Calculates the indices in a colormap's lookup table.
+
+    Values are quantized in the same way as `matplotlib` colormaps do.
+
+    Args:
+        x (float | numpy.ndarray): Values in the range from 0.0 to 1.0.
+
+    Returns:
+        out (numpy.ndarray): Indices.
+    """
+    x = np.asarray(x, dtype=np.float64)*RENDER_COLORMAP_SIZE
+    return np.clip(x, 0, RENDER_COLORMAP_SIZE - 1).astype(np.intp)
+
+
+def calc_elev_sea_indices(elevs):
+    """Calculates the indices in `RENDER_ELEV_SEA_LUT` of sea cells.
+
+    Args:
+        elevs (float | numpy.ndarray): Elevation of the cells which surface is
+            sea.
+
+    Returns:
+        out (numpy.ndarray): Indices.
+    """
+    return (np.asarray(elevs) >= SEA_LEVEL - ELEV_SD).astype(np.intp)
+
+
+def calc_elev_land_indices(elevs):
+    """Calculates the indices in `RENDER_ELEV_LAND_LUT` of land cells.
+
+    Args:
+        elevs (float | numpy.ndarray): Elevation of the cells which surface is
+            land.
+
+    Returns:
+        out (numpy.ndarray): Indices.
+    """
+    steps = (np.asarray(elevs) - RENDER_ELEV_MIN)//RENDER_ELEV_TONE_WIDTH
+    return np.clip(steps, 0, RENDER_ELEV_LAND_MAX_STEP).astype(np.intp)
+
 
 def calc_elev_sea_color(elev):
     """Calculates the rendering color based on a sea cell's elevation.
@@ -39,11 +135,7 @@ def calc_elev_sea_color(elev):
     Returns:
         out (float): Monochrome color level.
     """
-    if elev < SEA_LEVEL - ELEV_SD:
-        c = RENDER_ELEV_SEA_COLOR_DEEP
-    else:
-        c = RENDER_ELEV_SEA_COLOR_SHALLOW
-    return c
+    return float(RENDER_ELEV_SEA_LUT[calc_elev_sea_indices(elev), 0])
 
 
 def calc_elev_land_color(elev):
@@ -55,17 +147,7 @@ def calc_elev_land_color(elev):
     Returns:
         out (float): Monochrome color level.
     """
-    if elev < RENDER_ELEV_MIN:
-        c = RENDER_ELEV_LAND_COLOR_MIN
-    elif RENDER_ELEV_MAX < elev:
-        c = RENDER_ELEV_LAND_COLOR_MAX
-    else:
-        step = (elev - RENDER_ELEV_MIN)//RENDER_ELEV_TONE_WIDTH
-        c = float(int(
-            (RENDER_ELEV_LAND_COLOR_MAX - RENDER_ELEV_LAND_COLOR_MIN)
-            /math.pow(RENDER_ELEV_LAND_MAX_STEP, 3)*math.pow(step, 3)
-                + RENDER_ELEV_LAND_COLOR_MIN))
-    return c
+    return float(RENDER_ELEV_LAND_LUT[calc_elev_land_indices(elev), 0])
 
 
 def calc_elev_color(cell):
@@ -123,12 +205,106 @@ def calc_stpn_color(cell):
         color = np.array([c, c, c, 255.0], dtype=np.float64)
     elif cell.surface == Cell.SURFACE_LAND:
         x = min(cell.stpn, RENDER_STPN_MAX)/RENDER_STPN_MAX
-        color = 255.0*np.array(cm.viridis(x), dtype=np.float64)
+        color = RENDER_VIRIDIS_LUT[calc_colormap_indices(x)].astype(
+            np.float64)
     else:
         color = np.array([0.0, 0.0, 0.0, 255.0], dtype=np.float64)
     return color
 
 
+def select_surface_colors(field, sea_colors, land_colors, other_color):
+    """Selects every cell's color depending on the state of its surface.
+
+    Args:
+        field (src.field.field.Field): Field to render.
+        sea_colors (numpy.ndarray): Colors for sea cells.
+        land_colors (numpy.ndarray): Colors for land cells.
+        other_color (list[float]): Color for the other cells.
+
+    Returns:
+        out (numpy.ndarray): Colors (RGBA) shaped (height, width, 4).
+    """
+    surfaces = field.surfaces[..., np.newaxis]
+    colors = np.where(
+        surfaces == Cell.SURFACE_SEA, sea_colors,
+        np.where(surfaces == Cell.SURFACE_LAND, land_colors,
+                 np.array(other_color, dtype=np.uint8)))
+    return colors.astype(np.uint8, copy=False)
+
+
+def calc_elev_colors(field):
+    """Calculates the rendering colors based on cells' elevation.
+
+    This is the array version of `calc_elev_color()`.
+
+    Args:
+        field (src.field.field.Field): Field to render.
+
+    Returns:
+        out (numpy.ndarray): Colors (RGBA) shaped (height, width, 4).
+    """
+    return select_surface_colors(
+        field,
+        RENDER_ELEV_SEA_LUT[calc_elev_sea_indices(field.elevs)],
+        RENDER_ELEV_LAND_LUT[calc_elev_land_indices(field.elevs)],
+        [255, 0, 255, 255])
+
+
+def calc_elev_colors_simple(field):
+    """Calculates the rendering colors based on cells' elevation in a simple
+    way.
+
+    This is the array version of `calc_elev_color_simple()`.
+
+    Args:
+        field (src.field.field.Field): Field to render.
+
+    Returns:
+        out (numpy.ndarray): Colors (RGBA) shaped (height, width, 4).
+    """
+    return select_surface_colors(
+        field, RENDER_ELEV_SEA_LUT[0], RENDER_ELEV_LAND_LUT[0],
+        [255, 0, 255, 255])
+
+
+def calc_stpn_colors(field):
+    """Calculates the rendering colors based on cells' steepness.
+
+    This is the array version of `calc_stpn_color()`.
+
+    Args:
+        field (src.field.field.Field): Field to render.
+
+    Returns:
+        out (numpy.ndarray): Colors (RGBA) shaped (height, width, 4).
+    """
+    x = np.minimum(field.stpns, RENDER_STPN_MAX)/RENDER_STPN_MAX
+    return select_surface_colors(
+        field,
+        RENDER_ELEV_SEA_LUT[calc_elev_sea_indices(field.elevs)],
+        RENDER_VIRIDIS_LUT[calc_colormap_indices(x)],
+        [0, 0, 0, 255])
+
+
+def calc_land_dist_colors(field):
+    """Calculates the rendering colors based on sea cells' distance to land.
+
+    Args:
+        field (src.field.field.Field): Field to render.
+
+    Returns:
+        out (numpy.ndarray): Colors (RGBA) shaped (height, width, 4).
+    """
+    dists = np.where(
+        field.land_dists < 0, RENDER_LAND_DIST_MAX, field.land_dists)
+    x = np.minimum(dists, RENDER_LAND_DIST_MAX)/RENDER_LAND_DIST_MAX
+    return select_surface_colors(
+        field,
+        RENDER_VIRIDIS_LUT[calc_colormap_indices(1.0 - x)],
+        RENDER_ELEV_LAND_LUT[0],
+        [0, 0, 0, 255])
+
+
 def calc_cell_rect(cell):
     """Calculates a rect that encloses a cell's area.
 
@@ -156,14 +332,66 @@ def render_cell(surface, cell, color_func):
     pygame.draw.rect(surface, color, rect)
 
 
+def calc_field_image(colors):
+    """Calculates the image of a field from the colors of its cells.
+
+    Every cell is a 2x2 block of pixels, and odd rows are shifted by a pixel
+    (half a cell) to the east.
+
+    Args:
+        colors (numpy.ndarray): Colors (RGBA) of cells shaped (height, width,
+            4).
+
+    Returns:
+        out (tuple[numpy.ndarray, numpy.ndarray]): Image shaped (2*height,
+            2*width + 1, 4), and a mask that indicates which pixels are
+            covered by cells.
+    """
+    height, width = colors.shape[:2]
+    blocks = np.repeat(np.repeat(colors, 2, axis=0), 2, axis=1)
+    odd_rows = (np.arange(2*height)//2) % 2 == 1
+
+    image = np.zeros((2*height, 2*width + 1, 4), dtype=np.uint8)
+    image[~odd_rows, :-1] = blocks[~odd_rows]
+    image[odd_rows, 1:] = blocks[odd_rows]
+
+    covered = np.ones(image.shape[:2], dtype=bool)
+    covered[~odd_rows, -1] = False
+    covered[odd_rows, 0] = False
+    return image, covered
+
+
+def render_image(surface, image, covered):
+    """Renders an image on a surface, overwriting the covered pixels.
+
+    Args:
+        surface (pygame.Surface): Surface to render the image.
+        image (numpy.ndarray): Image (RGBA) shaped (height, width, 4).
+        covered (numpy.ndarray): Mask that indicates which pixels to render.
+    """
+    w = min(surface.get_width(), image.shape[1])
+    h = min(surface.get_height(), image.shape[0])
+    image = image[:h, :w].transpose(1, 0, 2)
+    covered = covered[:h, :w].T
+
+    pixels = pygame.surfarray.pixels3d(surface)
+    np.copyto(pixels[:w, :h], image[..., 0:3], where=covered[..., np.newaxis])
+    del pixels
+    if surface.get_flags() & pygame.SRCALPHA:
+        alphas = pygame.surfarray.pixels_alpha(surface)
+        np.copyto(alphas[:w, :h], image[..., 3], where=covered)
+        del alphas
+
+
 def render_field(surface, field, color_func):
     """Renders a field on a surface.
 
     Args:
         surface (pygame.Surface): Surface to render the field.
         field (src.field.field.Field): Field to render.
-        color_func (Callable[src.field.cell.Cell, numpy.ndarray]): Function to
-            calculate the rendering color.
+        color_func (Callable[src.field.field.Field, numpy.ndarray]): Function
+            to calculate the rendering colors of all cells, such as
+            `calc_elev_colors()`.
     """
-    for cell in itertools.chain.from_iterable(field.cells):
-        render_cell(surface, cell, color_func)
+    image, covered = calc_field_image(color_func(field))
+    render_image(surface, image, covered)
@@ -1,11 +1,10 @@
 """Module for terrain generation."""
 
-import itertools
-import math
 import random
 
+import numpy as np
+
 from src.field import (
-    CELL_DISTANCE,
     ELEV_MEAN,
     ELEV_SD,
     SEA_LEVEL,
@@ -25,105 +24,192 @@ ELEV_GEN_ADJUST_OFFSET = -0.2
 ELEV_GEN_ADJUST_SCALE = 0.25
 
 
-def generate_terrain(field, seed):
+def generate_terrain(field, seed, compat=True):
     """Generates terrain on a field.
 
     Args:
         field (src.field.field.Field): Field to generate terrain on.
         seed (int): Seed value for terrain generation.
+        compat (bool): If `True`, random numbers are drawn from the `random`
+            module one by one, and the terrain is the same as the one
+            generated by the former cell-by-cell implementation. Otherwise,
+            they are drawn in batches from `numpy.random.Generator`, which is
+            faster but generates different terrain for the same seed.
     """
-    random.seed(seed)
-    calc_elevs(field)
+    if compat:
+        random.seed(seed)
+        draw_gauss = draw_gauss_compat
+    else:
+        rng = np.random.default_rng(seed)
+
+        def draw_gauss(mu, sigma, n):
+            return rng.normal(mu, sigma, n)
+    calc_elevs(field, draw_gauss)
     determine_sea_or_land(field)
+    label_components(field)
     calc_stpns(field)
+    calc_land_dists(field)
 
 
-def create_close_list(field):
-    """Creates a close list that is referred while terrain generation.
+def draw_gauss_compat(mu, sigma, n):
+    """Draws random numbers from a Gaussian distribution with `random`.
+
+    Args:
+        mu (float): Mean.
+        sigma (float): Standard deviation.
+        n (int): Number of random numbers.
+
+    Returns:
+        out (numpy.ndarray): Random numbers in the order they are drawn.
+    """
+    return np.array(
+        [random.gauss(mu, sigma) for _ in range(n)], dtype=np.float64)
+
+
+def create_close_mask(field):
+    """Creates a close mask that is referred while terrain generation.
 
     Args:
         field (src.field.field.Field): Field to generate terrain on.
 
     Returns:
-        out (list[list[bool]]): Close list. All values in it are `False`.
+        out (numpy.ndarray): Close mask shaped (height, width). All values in
+            it are `False`.
     """
-    close_list = []
-    for _ in range(field.height):
-        temp_close_list = []
-        for _ in range(field.width):
-            temp_close_list.append(False)
-        close_list.append(temp_close_list)
-    return close_list
+    return np.zeros((field.height, field.width), dtype=bool)
 
 
-def calc_elevs(field):
+def calc_elevs(field, draw_gauss):
     """Calculates cells' elevation on a field.
 
     Args:
         field (src.field.field.Field): Field to generate terrain on.
+        draw_gauss (Callable[[float, float, int], numpy.ndarray]): Function to
+            draw random numbers from a Gaussian distribution.
     """
-    close_list = create_close_list(field)
-    init_elevs(field, close_list)
-    interpolate_elevs(field, close_list)
+    close_mask = create_close_mask(field)
+    init_elevs(field, close_mask, draw_gauss)
+    interpolate_elevs(field, close_mask, draw_gauss)
     lower_elevs_in_south_half(field)
     rescale_elevs(field, ELEV_MEAN, ELEV_SD)
 
 
-def init_elevs(field, close_list):
+def init_elevs(field, close_mask, draw_gauss):
     """Initializes cells' elevation on a field.
 
     Args:
         field (src.field.field.Field): Field to generate terrain on.
-        close_list (list[list[bool]]): Close list.
-    """
-    for i in range(field.height):
-        for j in range(field.width):
-            cell = field.cells[i][j]
-            initial_cell = (
-                (cell.row % field.scale == 0)
-                and (cell.col % field.scale
-                        == ((cell.row//field.scale) % 2)*field.scale//2))
-            if cell.row == 0:
-                # North end
-                cell.elev = ELEV_GEN_N
-                close_list[i][j] = True
-            elif cell.row == field.height - 1:
-                # South end
-                cell.elev = ELEV_GEN_S
-                close_list[i][j] = True
-            elif cell.col == 0:
-                # West/east end
-                cell.elev = ELEV_GEN_WE
-                close_list[i][j] = True
-            elif initial_cell:
-                # Cells that have an initial elevation
-                cell.elev = random.gauss(ELEV_GEN_MEAN, ELEV_GEN_SD)
-                close_list[i][j] = True
-
-
-def interpolate_elevs_horizontally(field, close_list, scale, complexity):
+        close_mask (numpy.ndarray): Close mask.
+        draw_gauss (Callable[[float, float, int], numpy.ndarray]): Function to
+            draw random numbers from a Gaussian distribution.
+    """
+    rows = np.arange(field.height)[:, np.newaxis]
+    cols = np.arange(field.width)[np.newaxis, :]
+    initial_mask = (
+        (rows % field.scale == 0)
+        & (cols % field.scale
+            == ((rows//field.scale) % 2)*field.scale//2))
+
+    field.elevs[:, :] = 0.0
+
+    # West/east end
+    field.elevs[:, 0] = ELEV_GEN_WE
+    close_mask[:, 0] = True
+
+    # North end
+    field.elevs[0, :] = ELEV_GEN_N
+    close_mask[0, :] = True
+
+    # South end
+    field.elevs[-1, :] = ELEV_GEN_S
+    close_mask[-1, :] = True
+
+    # Cells that have an initial elevation
+    initial_mask &= ~close_mask
+    indices = np.flatnonzero(initial_mask)
+    field.elevs.flat[indices] = draw_gauss(
+        ELEV_GEN_MEAN, ELEV_GEN_SD, len(indices))
+    close_mask |= initial_mask
+
+
+def interpolate_elevs_at(field, close_mask, draw_gauss, rows, cols,
+                         ref_rows_1, ref_cols_1, ref_rows_2, ref_cols_2,
+                         complexity):
+    """Interpolates cells' elevation on a field at the given locations.
+
+    Cells that are already closed are skipped. Random numbers are drawn in
+    the row-major order of the remaining cells.
+
+    Args:
+        field (src.field.field.Field): Field to generate terrain on.
+        close_mask (numpy.ndarray): Close mask.
+        draw_gauss (Callable[[float, float, int], numpy.ndarray]): Function to
+            draw random numbers from a Gaussian distribution.
+        rows (numpy.ndarray): Rows of the cells to interpolate.
+        cols (numpy.ndarray): Columns of the cells to interpolate.
+        ref_rows_1 (numpy.ndarray): Rows of the first reference cells.
+        ref_cols_1 (numpy.ndarray): Columns of the first reference cells.
+        ref_rows_2 (numpy.ndarray): Rows of the second reference cells.
+        ref_cols_2 (numpy.ndarray): Columns of the second reference cells.
+        complexity (float): Elevation complexity.
+    """
+    open_mask = ~close_mask[rows, cols]
+    rows, cols = rows[open_mask], cols[open_mask]
+    ref_elevs_1 = field.elevs[ref_rows_1[open_mask], ref_cols_1[open_mask]]
+    ref_elevs_2 = field.elevs[ref_rows_2[open_mask], ref_cols_2[open_mask]]
+    elevs = (ref_elevs_1 + ref_elevs_2)/2
+    elevs += draw_gauss(0.0, complexity, len(elevs))
+    field.elevs[rows, cols] = elevs
+    close_mask[rows, cols] = True
+
+
+def interpolate_elevs_horizontally(field, close_mask, draw_gauss, scale,
+                                   complexity):
     """Interpolates cells' elevation on a field horizontally.
 
     Args:
         field (src.field.field.Field): Field to generate terrain on.
-        close_list (list[list[bool]]): Close list.
+        close_mask (numpy.ndarray): Close mask.
+        draw_gauss (Callable[[float, float, int], numpy.ndarray]): Function to
+            draw random numbers from a Gaussian distribution.
         scale (int): Interpolation scale.
         complexity (float): Elevation complexity.
     """
-    for i in range(0, field.height, scale):
-        for j in range(0, field.width, scale//2):
-            if close_list[i][j]:
-                continue
-            cell = field.cells[i][j]
-            r, c = cell.row, cell.col
-            ref_cell_1 = field.cells[r][(c - scale//2) % field.width]
-            ref_cell_2 = field.cells[r][(c + scale//2) % field.width]
-            cell.elev = (ref_cell_1.elev + ref_cell_2.elev)/2
-            cell.elev += random.gauss(0.0, complexity)
-            close_list[i][j] = True
+    rows, cols = np.meshgrid(
+        np.arange(0, field.height, scale),
+        np.arange(0, field.width, scale//2), indexing="ij")
+    rows, cols = rows.ravel(), cols.ravel()
+    interpolate_elevs_at(
+        field, close_mask, draw_gauss, rows, cols,
+        rows, (cols - scale//2) % field.width,
+        rows, (cols + scale//2) % field.width,
+        complexity)
 
 
-def interpolate_elevs_vertically_nw_se(field, close_list, scale, complexity):
+def calc_vertical_targets(field, scale, j_start_factors):
+    """Calculates the locations of cells to interpolate vertically.
+
+    Args:
+        field (src.field.field.Field): Field to generate terrain on.
+        scale (int): Interpolation scale.
+        j_start_factors (numpy.ndarray): Factors that determine the first
+            column in every row. Indexed by the parity of `row//scale`.
+
+    Returns:
+        out (tuple[numpy.ndarray, numpy.ndarray]): Rows and columns of the
+            cells in row-major order.
+    """
+    rows = np.arange(scale//2, field.height, scale)
+    j_starts = j_start_factors[(rows//scale) % 2]*scale//4
+    n_cols = -(-(field.width - j_starts.min())//scale)
+    cols = j_starts[:, np.newaxis] + scale*np.arange(n_cols)[np.newaxis, :]
+    rows = np.broadcast_to(rows[:, np.newaxis], cols.shape)
+    valid = cols < field.width
+    return rows[valid], cols[valid]
+
+
+def interpolate_elevs_vertically_nw_se(field, close_mask, draw_gauss, scale,
+                                       complexity):
     """Interpolates cells' elevation on a field vertically.
 
     This function refers to the elevation of a north-west cell and a south-east
@@ -131,26 +217,22 @@ def interpolate_elevs_vertically_nw_se(field, close_list, scale, complexity):
 
     Args:
         field (src.field.field.Field): Field to generate terrain on.
-        close_list (list[list[bool]]): Close list.
+        close_mask (numpy.ndarray): Close mask.
+        draw_gauss (Callable[[float, float, int], numpy.ndarray]): Function to
+            draw random numbers from a Gaussian distribution.
         scale (int): Interpolation scale.
         complexity (float): Elevation complexity.
     """
-    for i in range(scale//2, field.height, scale):
-        j_start = (2*((i//scale) % 2) + 1)*scale//4
-        for j in range(j_start, field.width, scale):
-            if close_list[i][j]:
-                continue
-            cell = field.cells[i][j]
-            r, c = cell.row, cell.col
-            ref_cell_1 = field.cells[r - scale//2][c - scale//4]
-            ref_cell_2 = \
-                field.cells[r + scale//2][(c + scale//4) % field.width]
-            cell.elev = (ref_cell_1.elev + ref_cell_2.elev)/2
-            cell.elev += random.gauss(0.0, complexity)
-            close_list[i][j] = True
-
-
-def interpolate_elevs_vertically_ne_sw(field, close_list, scale, complexity):
+    rows, cols = calc_vertical_targets(field, scale, np.array([1, 3]))
+    interpolate_elevs_at(
+        field, close_mask, draw_gauss, rows, cols,
+        rows - scale//2, (cols - scale//4) % field.width,
+        rows + scale//2, (cols + scale//4) % field.width,
+        complexity)
+
+
+def interpolate_elevs_vertically_ne_sw(field, close_mask, draw_gauss, scale,
+                                       complexity):
     """Interpolates cells' elevation on a field vertically.
 
     This function refers to the elevation of a north-east cell and a south-west
@@ -158,40 +240,38 @@ def interpolate_elevs_vertically_ne_sw(field, close_list, scale, complexity):
 
     Args:
         field (src.field.field.Field): Field to generate terrain on.
-        close_list (list[list[bool]]): Close list.
+        close_mask (numpy.ndarray): Close mask.
+        draw_gauss (Callable[[float, float, int], numpy.ndarray]): Function to
+            draw random numbers from a Gaussian distribution.
         scale (int): Interpolation scale.
         complexity (float): Elevation complexity.
     """
-    for i in range(scale//2, field.height, scale):
-        j_start = (3 - 2*((i//scale) % 2))*scale//4
-        for j in range(j_start, field.width, scale):
-            if close_list[i][j]:
-                continue
-            cell = field.cells[i][j]
-            r, c = cell.row, cell.col
-            ref_cell_1 = \
-                field.cells[r - scale//2][(c + scale//4) % field.width]
-            ref_cell_2 = field.cells[r + scale//2][c - scale//4]
-            cell.elev = (ref_cell_1.elev + ref_cell_2.elev)/2
-            cell.elev += random.gauss(0.0, complexity)
-            close_list[i][j] = True
-
-
-def interpolate_elevs(field, close_list):
+    rows, cols = calc_vertical_targets(field, scale, np.array([3, 1]))
+    interpolate_elevs_at(
+        field, close_mask, draw_gauss, rows, cols,
+        rows - scale//2, (cols + scale//4) % field.width,
+        rows + scale//2, (cols - scale//4) % field.width,
+        complexity)
+
+
+def interpolate_elevs(field, close_mask, draw_gauss):
     """Interpolates cells' elevation on a field.
 
     Args:
         field (src.field.field.Field): Field to generate terrain on.
-        close_list (list[list[bool]]): Close list.
+        close_mask (numpy.ndarray): Close mask.
+        draw_gauss (Callable[[float, float, int], numpy.ndarray]): Function to
+            draw random numbers from a Gaussian distribution.
     """
     scale = field.scale
     complexity = ELEV_GEN_COMPLEXITY
     while scale > 1:
-        interpolate_elevs_horizontally(field, close_list, scale, complexity)
+        interpolate_elevs_horizontally(
+            field, close_mask, draw_gauss, scale, complexity)
         interpolate_elevs_vertically_nw_se(
-            field, close_list, scale, complexity)
+            field, close_mask, draw_gauss, scale, complexity)
         interpolate_elevs_vertically_ne_sw(
-            field, close_list, scale, complexity)
+            field, close_mask, draw_gauss, scale, complexity)
         scale //= 2
         complexity /= 2
 
@@ -202,10 +282,10 @@ def lower_elevs_in_south_half(field):
     Args:
         field (src.field.field.Field): Field to generate terrain on.
     """
-    for cell in itertools.chain.from_iterable(field.cells):
-        phase = 2*math.pi*cell.row/(field.height - 1)
-        cell.elev += ELEV_GEN_ADJUST_OFFSET
-        cell.elev += ELEV_GEN_ADJUST_SCALE*math.sin(phase)
+    rows = np.arange(field.height, dtype=np.float64)[:, np.newaxis]
+    phases = 2*np.pi*rows/(field.height - 1)
+    field.elevs += ELEV_GEN_ADJUST_OFFSET
+    field.elevs += ELEV_GEN_ADJUST_SCALE*np.sin(phases)
 
 
 def rescale_elevs(field, mean, sd):
@@ -217,8 +297,8 @@ def rescale_elevs(field, mean, sd):
         sd (float): Standard deviation of elevation.
     """
     scale = sd/ELEV_GEN_SD
-    for cell in itertools.chain.from_iterable(field.cells):
-        cell.elev = scale*cell.elev + mean
+    field.elevs *= scale
+    field.elevs += mean
 
 
 def determine_sea_or_land(field):
@@ -227,11 +307,95 @@ def determine_sea_or_land(field):
     Args:
         field (src.field.field.Field): Field to generate terrain on.
     """
-    for cell in itertools.chain.from_iterable(field.cells):
-        if cell.elev < SEA_LEVEL:
-            cell.surface = Cell.SURFACE_SEA
-        else:
-            cell.surface = Cell.SURFACE_LAND
+    field.surfaces[:, :] = np.where(
+        field.elevs < SEA_LEVEL, Cell.SURFACE_SEA, Cell.SURFACE_LAND)
+
+
+def label_components(field):
+    """Labels the connected components of land cells and of sea cells.
+
+    Components are found by hooking the root of every cell to the smallest
+    root among its adjacent cells of the same surface, and compressing the
+    roots by pointer jumping until no adjacent cells have different roots.
+    Adjacency comes from the neighbor table, so components connect across
+    the east-west wrap. Labels are numbered in the order of the first cell
+    of each component.
+
+    Args:
+        field (src.field.field.Field): Field to generate terrain on.
+    """
+    flat_surfaces = field.surfaces.ravel()
+    cells = np.arange(field.n_cells, dtype=np.int32)
+
+    # Pairs of adjacent cells of the same surface. The east, south-west and
+    # south-east slots cover every pair once.
+    cells_u = []
+    cells_v = []
+    for k in (3, 4, 5):
+        neighbors = field.neighbor_indices[..., k].ravel()
+        same = field.neighbor_mask[..., k].ravel() & (
+            flat_surfaces[neighbors] == flat_surfaces)
+        cells_u.append(cells[same])
+        cells_v.append(neighbors[same])
+    cells_u = np.concatenate(cells_u)
+    cells_v = np.concatenate(cells_v)
+
+    roots = cells.copy()
+    while True:
+        roots_u = roots[cells_u]
+        roots_v = roots[cells_v]
+        apart = roots_u != roots_v
+        if not np.any(apart):
+            break
+        # Pairs that have been joined stay joined
+        cells_u, cells_v = cells_u[apart], cells_v[apart]
+        roots_u, roots_v = roots_u[apart], roots_v[apart]
+        np.minimum.at(
+            roots, np.maximum(roots_u, roots_v),
+            np.minimum(roots_u, roots_v))
+        while True:
+            next_roots = roots[roots]
+            if np.array_equal(next_roots, roots):
+                break
+            roots = next_roots
+
+    # Number the roots in order. Roots are the first cells of components.
+    is_root = roots == cells
+    first_cells = np.flatnonzero(is_root)
+    labels = (np.cumsum(is_root, dtype=np.int32) - 1)[roots]
+    sizes = np.bincount(labels, minlength=len(first_cells))
+
+    # Rows of the bounding boxes
+    row_mins = first_cells//field.width
+    row_maxs = np.zeros(len(first_cells), dtype=np.int64)
+    np.maximum.at(row_maxs, labels, cells//field.width)
+
+    # Columns of the bounding boxes. Each box spans the columns outside the
+    # largest gap between the columns that a component occupies, so it may
+    # wrap around.
+    keys = labels.astype(np.int64)*field.width + cells % field.width
+    # Cells below a cell of the same component add no columns
+    new_cols = np.ones(field.n_cells, dtype=bool)
+    new_cols[field.width:] = labels[field.width:] != labels[:-field.width]
+    keys = np.unique(keys[new_cols])
+    key_labels, cols = np.divmod(keys, field.width)
+    key_starts = np.flatnonzero(np.diff(key_labels, prepend=-1))
+    key_ends = np.append(key_starts[1:], len(keys)) - 1
+    gaps = np.empty(len(keys), dtype=np.int64)
+    gaps[1:] = cols[1:] - cols[:-1] - 1
+    gaps[key_starts] = (
+        cols[key_starts] + field.width - cols[key_ends] - 1)
+    max_gaps = np.maximum.reduceat(gaps, key_starts)
+    widest = np.flatnonzero(gaps == max_gaps[key_labels])
+    _, first = np.unique(key_labels[widest], return_index=True)
+    col_mins = cols[widest[first]]
+    col_maxs = col_mins + field.width - max_gaps - 1
+
+    field.labels[:, :] = labels.reshape(field.labels.shape)
+    field.label_sizes = sizes
+    field.label_surfaces = flat_surfaces[first_cells]
+    field.label_bboxes = np.stack(
+        [row_mins, col_mins, row_maxs, col_maxs], axis=-1).astype(np.int32)
 
 
 def calc_stpns(field):
@@ -240,9 +404,44 @@ def calc_stpns(field):
     Args:
         field (src.field.field.Field): Field to generate terrain on.
     """
-    for cell in itertools.chain.from_iterable(field.cells):
-        cell.stpn = 0.0
-        for neighbor in cell.neighborhood:
-            cell.stpn += abs(neighbor.elev - cell.elev)
-        cell.stpn /= CELL_DISTANCE
-        cell.stpn /= len(cell.neighborhood)
+    flat_elevs = field.elevs.ravel()
+    field.stpns[:, :] = 0.0
+    for k in range(field.neighbor_indices.shape[-1]):
+        # Masked slots refer to the cell itself, so they add nothing
+        neighbor_elevs = flat_elevs[field.neighbor_indices[..., k]]
+        field.stpns += np.abs(neighbor_elevs - field.elevs)
+    field.stpns /= field.config.cell_distance
+    field.stpns /= field.n_neighbors
+
+
+def calc_land_dists(field):
+    """Calculates the distance from every cell to the nearest land cell.
+
+    The distance is the number of hops between adjacent cells, and is found
+    by a breadth-first search that starts from all land cells at once. Each
+    cell also records the land cell that the search reached it from, which
+    is one of the nearest land cells.
+
+    Args:
+        field (src.field.field.Field): Field to generate terrain on.
+    """
+    neighbor_indices = field.neighbor_indices.reshape(-1, 6)
+    dists = np.full(field.n_cells, -1, dtype=np.int32)
+    nearest_lands = np.full(field.n_cells, -1, dtype=np.int32)
+
+    frontier = np.flatnonzero(field.surfaces.ravel() == Cell.SURFACE_LAND)
+    dists[frontier] = 0
+    nearest_lands[frontier] = frontier
+    dist = 0
+    while len(frontier) > 0:
+        dist += 1
+        neighbors = neighbor_indices[frontier].ravel()
+        sources = np.repeat(nearest_lands[frontier], 6)
+        unvisited = dists[neighbors] < 0
+        frontier, first = np.unique(neighbors[unvisited], return_index=True)
+        dists[frontier] = dist
+        nearest_lands[frontier] = sources[unvisited][first]
+
+    field.land_dists[:, :] = dists.reshape(field.land_dists.shape)
+    field.nearest_lands[:, :] = nearest_lands.reshape(
+        field.nearest_lands.shape)
@@ -1,28 +1,85 @@
+import argparse
 import ctypes
-import random
-import time
+import os
 
 import pygame
 import pygame.locals
 
-from src.civ.group import Group
+from src.camera import render_wrapped
 from src.civ.render import (
-    calc_character_color,
-    calc_diff_color,
-    calc_popl_color,
-    render_group,
+    GroupLayer,
+    calc_character_colors,
+    calc_diff_colors,
+    calc_popl_colors,
 )
-from src.field.field import Field
+from src.civ.worker import SimulationWorker
+from src.clock import (
+    RateMeter,
+    TurnClock,
+)
+from src.field.cache import TerrainCache
 from src.field.render import (
-    calc_elev_color,
-    calc_elev_color_simple,
-    calc_stpn_color,
+    calc_elev_colors,
+    calc_elev_colors_simple,
+    calc_land_dist_colors,
+    calc_stpn_colors,
     render_field,
 )
-from src.field.terrain import generate_terrain
+from src.profiling import (
+    PROFILE_DIR,
+    ProfileCapture,
+    parse_turn_range,
+)
+from src.scenario import load_scenario
+from src.timing import (
+    TIMING_FRAMES_CSV_NAME,
+    TIMING_TURN_PHASES,
+    TIMING_TURNS_CSV_NAME,
+    PhaseTimer,
+    format_phase_stats,
+)
+
+MAIN_FRAME_RATE = 60  # frames/s
+
+MAIN_TURN_RATE = 60.0        # turns/s
+MAIN_TURN_RATE_MIN = 1.0     # turns/s
+MAIN_TURN_RATE_MAX = 3840.0  # turns/s
+
+MAIN_FRAME_PHASES = (
+    "frame.wait", "frame.events", "frame.layers", "frame.minimap",
+    "frame.compose", "frame.scale", "frame.overlay", "frame.display")
+
 
+def parse_args(args=None):
+    """Parses command-line arguments.
+
+    Args:
+        args (list[str] | None): Arguments. If `None`, `sys.argv` is used.
+
+    Returns:
+        out (argparse.Namespace): Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main", description="Run the viewer.")
+    parser.add_argument(
+        "--timing-dir", help="path to a directory to write the phase times "
+        "of every turn and frame to as CSV (turns are timed from the start)")
+    parser.add_argument(
+        "--profile-turns", type=parse_turn_range, metavar="START:END",
+        help="profile the turns that advance the simulation from START to "
+        "END with cProfile (the P key starts and stops a capture as well)")
+    parser.add_argument(
+        "--profile-memory", action="store_true",
+        help="trace allocations with tracemalloc while profiling")
+    parser.add_argument(
+        "--profile-dir", default=PROFILE_DIR,
+        help="path to a directory to write profiles to")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
 
-def main():
     # For high DPI (Windows)
     try:
         user32 = ctypes.windll.user32
@@ -37,52 +94,92 @@ def main():
     pygame.display.set_caption(title="nekociv")
 
     # Field
-    field = Field()
-    field_seed = 9  # 3, 9
-    generate_terrain(field, field_seed)
+    scenario = load_scenario()
+    field = scenario.create_field(TerrainCache())
 
-    field_sfc_1 = pygame.Surface(size=(1025, 514), flags=pygame.SRCALPHA)
-    field_sfc_2 = pygame.Surface(size=(1025, 514), flags=pygame.SRCALPHA)
-    render_field(field_sfc_1, field, calc_elev_color)
-    render_field(field_sfc_2, field, calc_elev_color_simple)
+    field_size = (2*field.width + 1, 2*field.height)
+    field_sfc_1 = pygame.Surface(size=field_size, flags=pygame.SRCALPHA)
+    field_sfc_2 = pygame.Surface(size=field_size, flags=pygame.SRCALPHA)
+    render_field(field_sfc_1, field, calc_elev_colors)
+    render_field(field_sfc_2, field, calc_elev_colors_simple)
+    land_dist_sfc = pygame.Surface(size=field_size, flags=pygame.SRCALPHA)
+    render_field(land_dist_sfc, field, calc_land_dist_colors)
 
-    # Group
-    groups = []
+    # Layers shown on the minimap, switched with the M key
+    minimap_sfcs = [field_sfc_1, land_dist_sfc]
+    minimap_index = 0
 
-    central_cell = field.cells[80][200]
-    character = [0.5, 0.5, 0.5]
-    groups.append(Group(10, 20, character, central_cell))
-    for neighbor in central_cell.neighborhood:
-        groups.append(Group(10, 20, character, neighbor))
-
-    """
-    central_cell = field.cells[80][320]
-    character = [0.5, 0.5, 1.0]
-    groups.append(Group(10, 20, character, central_cell))
-    for neighbor in central_cell.neighborhood:
-        groups.append(Group(10, 20, character, neighbor))
-    """
+    # Group
+    simulation = scenario.create_simulation(field)
 
-    popl_sfc = pygame.Surface(size=(1025, 514), flags=pygame.SRCALPHA)
-    char_sfc = pygame.Surface(size=(1025, 514), flags=pygame.SRCALPHA)
+    popl_sfc = pygame.Surface(size=field_size, flags=pygame.SRCALPHA)
+    char_sfc = pygame.Surface(size=field_size, flags=pygame.SRCALPHA)
+    popl_layer = GroupLayer(popl_sfc, field, "popl", calc_popl_colors)
+    char_layer = GroupLayer(
+        char_sfc, field, "character", calc_character_colors)
 
     # Main loop
-    sim_seed = 1
-    random.seed(sim_seed)
-
     m_pressing = False
     m_x0, m_y0 = pygame.mouse.get_pos()
     m_x1, m_y1 = m_x0, m_y0
     m_wh = 0
 
-    major_sfc = pygame.Surface(size=(1025, 514), flags=pygame.SRCALPHA)
-    cam_ax, cam_ay = 1025/2, 514/2
+    # The field repeats east-west every 2 pixels a column, and only the part
+    # of it that is visible in the window is scaled
+    major_sfc = pygame.Surface(size=field_size, flags=pygame.SRCALPHA)
+    major_period = 2*field.width
+    view_w, view_h = 1025, 1025*field_size[1]/field_size[0]
+    view_period = major_period*view_w/field_size[0]
+    cam_ax, cam_ay = view_w/2, view_h/2
     cam_x, cam_y = 0, 0
     cam_scale = 1.0
 
+    # Frame phases are always timed, which is a few clock reads a frame.
+    # Turns and group updates are timed only while the overlay of the timers
+    # is shown with the T key, or when the times are written to CSV.
+    csv_paths = {}
+    if args.timing_dir is not None:
+        csv_paths = {
+            name: os.path.join(args.timing_dir, name)
+            for name in (TIMING_TURNS_CSV_NAME, TIMING_FRAMES_CSV_NAME)}
+    turn_timer = PhaseTimer(
+        TIMING_TURN_PHASES, csv_path=csv_paths.get(TIMING_TURNS_CSV_NAME))
+    frame_timer = PhaseTimer(
+        MAIN_FRAME_PHASES, csv_path=csv_paths.get(TIMING_FRAMES_CSV_NAME))
+    timing_shown = False
+    if args.timing_dir is not None:
+        simulation.set_timer(turn_timer)
+
+    # Turns are profiled in the worker thread from the P key to the next
+    # press, or for the range of turns given in the arguments
+    capture = ProfileCapture(
+        args.profile_dir, simulation.seed, args.profile_turns,
+        args.profile_memory)
+    n_profile_paths = 0
+
+    # The simulation advances in a worker thread, and the window renders the
+    # latest frame that the worker has published. The simulation rate is
+    # doubled with the + key and halved with the - key, and the simulation
+    # is paused with the space key.
+    clock = pygame.time.Clock()
+    turn_clock = TurnClock(MAIN_TURN_RATE)
+    worker = SimulationWorker(simulation, turn_clock, capture)
+    worker.start()
+    frame = None
+    frame_meter = RateMeter()
+    font = pygame.font.Font(None, 20)
+    timing_font = pygame.font.Font(None, 16)
+
     running = True
 
+    frame_timer.start()
     while running:
+        # Wait for the next frame
+        clock.tick(MAIN_FRAME_RATE)
+        frame_timer.lap("frame.wait")
+        if worker.error is not None:
+            raise worker.error
+
         # Poll events
         for event in pygame.event.get():
             if event.type == pygame.locals.QUIT:
@@ -92,6 +189,24 @@ def main():
                     cam_x = 0
                     cam_y = 0
                     cam_scale = 1.0
+                elif event.key == pygame.K_m:
+                    minimap_index = (minimap_index + 1) % len(minimap_sfcs)
+                elif event.key in (pygame.K_EQUALS, pygame.K_PLUS,
+                                   pygame.K_KP_PLUS):
+                    turn_clock.turns_per_sec = min(
+                        2*turn_clock.turns_per_sec, MAIN_TURN_RATE_MAX)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    turn_clock.turns_per_sec = max(
+                        turn_clock.turns_per_sec/2, MAIN_TURN_RATE_MIN)
+                elif event.key == pygame.K_SPACE:
+                    turn_clock.paused = not turn_clock.paused
+                elif event.key == pygame.K_p:
+                    capture.toggle()
+                elif event.key == pygame.K_t:
+                    timing_shown = not timing_shown
+                    if args.timing_dir is None:
+                        worker.request_timer(
+                            turn_timer if timing_shown else None)
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 m_pressing = True
             elif event.type == pygame.MOUSEBUTTONUP:
@@ -105,53 +220,78 @@ def main():
         if m_pressing:
             m_dx = m_x1 - m_x0
             m_dy = m_y1 - m_y0
-            cam_x += m_dx/cam_scale
+            cam_x = (cam_x + m_dx/cam_scale) % view_period
             cam_y += m_dy/cam_scale
         m_x0, m_y0 = m_x1, m_y1
         cam_scale *= 1.0 + 0.1*m_wh
         m_wh = 0
+        frame_timer.lap("frame.events")
 
-        # Simulation
-        #popl_sfc.fill([0, 0, 0, 0])
-        char_sfc.fill([0, 0, 0, 0])
-
-        groups_next = []
-        for group in groups:
-            new_group = group.update()
-            if group.alive:
-                groups_next.append(group)
-            if new_group != None and new_group.alive:
-                groups_next.append(new_group)
-        groups = groups_next
-        groups.sort(key=lambda group: group.popl)
-            # Groups act in order of population size, starting with the
-            # smallest
-
-        for group in groups:
-            #render_group(popl_sfc, group, calc_popl_color)
-            render_group(char_sfc, group, calc_character_color)
+        # Only cells whose group has changed are rendered again
+        new_frame = worker.frame_buffer.take()
+        if new_frame is not None:
+            frame = new_frame
+            #popl_layer.update(frame.dirty_cells, frame)
+            char_layer.update(frame.dirty_cells, frame)
+        frame_timer.lap("frame.layers")
 
         # Update the window
         window.fill([0, 0, 0])
 
-        window.blit(pygame.transform.scale(field_sfc_1, (512, 257)), (0, 514))
+        window.blit(
+            pygame.transform.scale(minimap_sfcs[minimap_index], (512, 257)),
+            (0, 514))
         #window.blit(pygame.transform.scale(popl_sfc, (512, 257)), (0, 514))
+        frame_timer.lap("frame.minimap")
 
         major_sfc.blit(field_sfc_2, (0, 0))
         major_sfc.blit(char_sfc, (0, 0))
+        frame_timer.lap("frame.compose")
 
         dst_x = cam_scale*(cam_x - cam_ax) + cam_ax
         dst_y = cam_scale*(cam_y - cam_ay) + cam_ay
-        dst_w = cam_scale*1025
-        dst_h = cam_scale*514
+        render_wrapped(
+            window, major_sfc, major_period, (dst_x, dst_y),
+            cam_scale*view_w/field_size[0])
+        frame_timer.lap("frame.scale")
 
-        window.blit(
-            pygame.transform.scale(major_sfc, (dst_w, dst_h)), (dst_x, dst_y))
+        # Achieved rates
+        text = (
+            f"turn {frame.turn}  "
+            f"{worker.turn_meter.rate:.1f}/{turn_clock.turns_per_sec:g} "
+            "turns/s  "
+            f"{frame_meter.rate:.1f} frames/s")
+        if turn_clock.paused:
+            text += "  (paused)"
+        if capture.active:
+            text += "  (profiling)"
+        window.blit(font.render(text, True, (255, 255, 255)), (4, 4))
+
+        # Rolling statistics of the phase timers
+        if timing_shown:
+            lines = format_phase_stats(
+                turn_timer.summarize() | frame_timer.summarize())
+            for k, line in enumerate(lines):
+                window.blit(
+                    timing_font.render(line, True, (255, 255, 255), (0, 0, 0)),
+                    (4, 24 + 14*k))
+        frame_timer.lap("frame.overlay")
 
         pygame.display.update()
+        frame_timer.lap("frame.display")
+        frame_timer.commit()
+        frame_meter.count()
 
-        time.sleep(1/60)
+        # Files of captures that the worker has finished
+        for path in capture.paths[n_profile_paths:]:
+            print(f"profile written to {path}", flush=True)
+        n_profile_paths = len(capture.paths)
 
+    worker.stop()
+    for path in capture.paths[n_profile_paths:]:
+        print(f"profile written to {path}", flush=True)
+    turn_timer.close()
+    frame_timer.close()
     pygame.quit()
 
 
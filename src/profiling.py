@@ -0,0 +1,189 @@
+"""Module for capturing profiles of simulations for a range of turns.
+
+A capture runs `cProfile` and optionally `tracemalloc` in the thread that
+advances turns, and writes the following files when it ends:
+
+- `<name>.pstats`: Profile readable with `pstats.Stats`.
+- `<name>.tracemalloc`: Snapshot of the allocations made during the
+  capture that are still alive, readable with
+  `tracemalloc.Snapshot.load()`.
+
+The name holds the seed and the range of turns, such as
+`profile-seed1-turns300-400`.
+"""
+
+import cProfile
+import os
+import tracemalloc
+
+PROFILE_DIR = "profiles"
+PROFILE_TRACEMALLOC_FRAMES = 16
+
+
+def parse_turn_range(text):
+    """Parses a range of turns written as `START:END`.
+
+    Args:
+        text (str): Range of turns.
+
+    Returns:
+        out (tuple[int, int]): First turn and the turn after the last one.
+
+    Raises:
+        ValueError: If the text is not a non-empty range of turns.
+    """
+    start, end = (int(value) for value in text.split(":"))
+    if not 0 <= start < end:
+        raise ValueError(f"invalid range of turns: {text}")
+    return start, end
+
+
+class ProfileCapture:
+    """Capture of `cProfile` and `tracemalloc` for a range of turns.
+
+    `before_turn()` and `after_turn()` must be called around every turn in
+    the thread that advances turns, since `cProfile` only profiles the
+    thread that enables it. A capture starts at the scheduled range of
+    turns, or when `toggle()` is called from any thread, such as on a
+    keypress.
+
+    Attributes:
+        directory (str): Directory that files are written to.
+        seed (int | None): Seed of the simulation, used in file names.
+        turn_range (tuple[int, int] | None): Scheduled range of turns. The
+            capture covers the turns that advance the simulation from the
+            first turn to the second.
+        memory (bool): Indicates if allocations are traced.
+        profile (cProfile.Profile | None): Profiler while capturing.
+        turn_start (int | None): Turn that the current capture started at.
+        toggle_requested (bool): Indicates if the capture is to be started
+            or stopped at the next turn.
+        paths (list[str]): Paths to the files written so far.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, seed=None, turn_range=None,
+                 memory=False):
+        """Capture of `cProfile` and `tracemalloc` for a range of turns.
+
+        Args:
+            directory (str): Directory that files are written to.
+            seed (int | None): Seed of the simulation, used in file names.
+            turn_range (tuple[int, int] | None): Scheduled range of turns.
+                If `None`, captures are only started by `toggle()`.
+            memory (bool): If `True`, allocations are traced as well. If
+                `tracemalloc` is already tracing, its snapshot is written
+                and it is left running.
+        """
+        self.directory = directory
+        self.seed = seed
+        self.turn_range = turn_range
+        self.memory = memory
+        self.profile = None
+        self.turn_start = None
+        self.toggle_requested = False
+        self.paths = []
+        self._tracing = False
+
+    @property
+    def active(self):
+        return self.profile is not None
+
+    def toggle(self):
+        """Requests to start or stop a capture at the next turn."""
+        self.toggle_requested = True
+
+    def before_turn(self, turn):
+        """Starts a capture if it is scheduled or requested.
+
+        Args:
+            turn (int): Turn of the simulation before it advances.
+        """
+        if self.active:
+            return
+        scheduled = self.turn_range is not None and turn == self.turn_range[0]
+        if scheduled or self.toggle_requested:
+            self.toggle_requested = False
+            self.start(turn)
+
+    def after_turn(self, turn):
+        """Stops the capture if its range has ended or it is requested.
+
+        Args:
+            turn (int): Turn of the simulation after it has advanced.
+
+        Returns:
+            out (list[str]): Paths to the written files. Empty if the
+                capture continues or there is none.
+        """
+        if not self.active:
+            return []
+        scheduled = self.turn_range is not None and turn == self.turn_range[1]
+        if scheduled or self.toggle_requested:
+            self.toggle_requested = False
+            return self.stop(turn)
+        return []
+
+    def start(self, turn):
+        """Starts a capture.
+
+        Args:
+            turn (int): Turn of the simulation before it advances.
+        """
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+            self._tracing = True
+        self.turn_start = turn
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self, turn):
+        """Stops the capture and writes its files.
+
+        Args:
+            turn (int): Turn of the simulation after it has advanced.
+
+        Returns:
+            out (list[str]): Paths to the written files.
+        """
+        self.profile.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        name = "profile"
+        if self.seed is not None:
+            name += f"-seed{self.seed}"
+        name += f"-turns{self.turn_start}-{turn}"
+        path = os.path.join(self.directory, name)
+
+        paths = [f"{path}.pstats"]
+        self.profile.dump_stats(paths[0])
+        if self.memory and tracemalloc.is_tracing():
+            paths.append(f"{path}.tracemalloc")
+            tracemalloc.take_snapshot().dump(paths[1])
+        elif self.memory:
+            print("memory was not captured, since tracemalloc was stopped "
+                  "elsewhere")
+        # Tracing started by others, such as `python -X tracemalloc`, is
+        # left running
+        if self._tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._tracing = False
+
+        self.profile = None
+        self.turn_start = None
+        self.paths.extend(paths)
+        return paths
+
+    def close(self, turn):
+        """Stops the capture if there is one, such as when a run ends.
+
+        This must be called in the thread that advances turns as well.
+
+        Args:
+            turn (int): Turn of the simulation.
+
+        Returns:
+            out (list[str]): Paths to the written files. Empty if there is
+                no capture.
+        """
+        if not self.active:
+            return []
+        return self.stop(turn)
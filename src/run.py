@@ -0,0 +1,215 @@
+"""Headless entry point that advances simulations without rendering.
+
+Usage:
+    python -m src.run [--scenario PATH] [--turns N] [--interval N]
+                      [--output PATH] [--no-cache] [--load PATH]
+                      [--save PATH] [--engine {group,table}]
+                      [--stats PATH] [--timing]
+                      [--timing-dir PATH] [--profile-turns START:END]
+                      [--profile-memory] [--profile-dir PATH]
+"""
+
+import argparse
+import json
+import os
+import time
+
+from src.civ.simulation import SIMULATION_ENGINES
+from src.civ.stats import StatsRecorder
+from src.field.cache import TerrainCache
+from src.profiling import (
+    PROFILE_DIR,
+    ProfileCapture,
+    parse_turn_range,
+)
+from src.scenario import (
+    SCENARIO_DEFAULT_PATH,
+    load_scenario,
+)
+from src.snapshot import (
+    load_snapshot,
+    save_snapshot,
+)
+from src.timing import (
+    TIMING_TURN_PHASES,
+    TIMING_TURNS_CSV_NAME,
+    PhaseTimer,
+    format_phase_stats,
+)
+
+
+def parse_int_at_least(minimum):
+    """Makes a parser of integer arguments that are not less than a value.
+
+    Args:
+        minimum (int): Smallest valid value.
+
+    Returns:
+        out (Callable[[str], int]): Parser used as the `type` of an argument.
+    """
+    def parse(text):
+        try:
+            value = int(text)
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"invalid int value: {text}") from None
+        if value < minimum:
+            raise argparse.ArgumentTypeError(
+                f"must be at least {minimum}: {text}")
+        return value
+
+    return parse
+
+
+def parse_args(args=None):
+    """Parses command-line arguments.
+
+    Args:
+        args (list[str] | None): Arguments. If `None`, `sys.argv` is used.
+
+    Returns:
+        out (argparse.Namespace): Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.run",
+        description="Advance a simulation without rendering.")
+    parser.add_argument(
+        "--scenario", default=SCENARIO_DEFAULT_PATH,
+        help="path to the scenario file")
+    parser.add_argument(
+        "--turns", type=parse_int_at_least(0), default=1000,
+        help="number of turns to advance")
+    parser.add_argument(
+        "--interval", type=parse_int_at_least(1), default=100,
+        help="number of turns between summaries")
+    parser.add_argument(
+        "--output", help="path to a file that summaries are appended to as "
+        "JSON lines")
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="always generate terrain instead of using the terrain cache")
+    parser.add_argument(
+        "--load", help="path to a snapshot file to resume instead of "
+        "starting the scenario")
+    parser.add_argument(
+        "--save", help="path to a snapshot file that the final state is "
+        "saved to")
+    parser.add_argument(
+        "--engine", choices=SIMULATION_ENGINES,
+        help="engine that updates groups (default: group, or the engine of "
+        "the snapshot with --load)")
+    parser.add_argument(
+        "--stats", help="path to a directory that statistics of every turn "
+        "are appended to")
+    parser.add_argument(
+        "--timing", action="store_true",
+        help="time the phases of turns and print their statistics")
+    parser.add_argument(
+        "--timing-dir", help="path to a directory to write the phase times "
+        "of every turn to as CSV (implies --timing)")
+    parser.add_argument(
+        "--profile-turns", type=parse_turn_range, metavar="START:END",
+        help="profile the turns that advance the simulation from START to "
+        "END with cProfile")
+    parser.add_argument(
+        "--profile-memory", action="store_true",
+        help="trace allocations with tracemalloc while profiling")
+    parser.add_argument(
+        "--profile-dir", default=PROFILE_DIR,
+        help="path to a directory to write profiles to")
+    return parser.parse_args(args)
+
+
+def format_summary(summary):
+    """Formats a summary of a simulation as a line.
+
+    Args:
+        summary (dict): Summary returned by
+            `src.civ.simulation.Simulation.summarize()` with `turns_per_sec`.
+
+    Returns:
+        out (str): Formatted summary.
+    """
+    return (
+        f"turn {summary['turn']}: {summary['n_groups']} groups, "
+        f"popl {summary['popl']}, {summary['n_landmasses']} landmasses, "
+        f"{summary['turns_per_sec']:.1f} turns/s")
+
+
+def main(args=None):
+    args = parse_args(args)
+
+    if args.load is None:
+        scenario = load_scenario(args.scenario)
+        cache = None if args.no_cache else TerrainCache()
+        field = scenario.create_field(cache)
+        simulation = scenario.create_simulation(
+            field, args.engine or "group")
+    else:
+        simulation = load_snapshot(args.load, engine=args.engine)
+
+    capture = None
+    if args.profile_turns is not None:
+        capture = ProfileCapture(
+            args.profile_dir, simulation.seed, args.profile_turns,
+            args.profile_memory)
+
+    output = None if args.output is None else open(
+        args.output, "a", encoding="utf-8")
+    recorder = None if args.stats is None else StatsRecorder(args.stats)
+    timer = None
+    if args.timing or args.timing_dir is not None:
+        timer = PhaseTimer(
+            TIMING_TURN_PHASES, window=max(args.turns, 1),
+            csv_path=None if args.timing_dir is None else os.path.join(
+                args.timing_dir, TIMING_TURNS_CSV_NAME))
+        simulation.set_timer(timer)
+    try:
+        time_start = time.perf_counter()
+        time_prev, turn_prev = time_start, simulation.turn
+        for _ in range(args.turns):
+            if capture is not None:
+                capture.before_turn(simulation.turn)
+            simulation.step()
+            if capture is not None:
+                for path in capture.after_turn(simulation.turn):
+                    print(f"profile written to {path}", flush=True)
+            if recorder is not None:
+                recorder.record(simulation)
+            if simulation.turn % args.interval != 0:
+                continue
+            time_curr = time.perf_counter()
+            summary = simulation.summarize()
+            summary["turns_per_sec"] = (
+                (simulation.turn - turn_prev)/(time_curr - time_prev))
+            time_prev, turn_prev = time_curr, simulation.turn
+            print(format_summary(summary), flush=True)
+            if output is not None:
+                output.write(json.dumps(summary) + "\n")
+                output.flush()
+        elapsed = time.perf_counter() - time_start
+    finally:
+        if output is not None:
+            output.close()
+        if capture is not None:
+            for path in capture.close(simulation.turn):
+                print(f"profile written to {path}", flush=True)
+        if recorder is not None:
+            recorder.close()
+        if timer is not None:
+            simulation.set_timer(None)
+            timer.close()
+
+    print(
+        f"{args.turns} turns in {elapsed:.2f} s "
+        f"({args.turns/max(elapsed, 1e-9):.1f} turns/s)")
+    if timer is not None:
+        for line in format_phase_stats(timer.summarize()):
+            print(line)
+
+    if args.save is not None:
+        save_snapshot(args.save, simulation)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Module for scenarios that describe the initial state of simulations."""
+
+import json
+import os
+
+from src.civ.group import Group
+from src.civ.simulation import Simulation
+from src.field.cache import generate_terrain_with_cache
+from src.field.config import FieldConfig
+from src.field.field import Field
+
+SCENARIO_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scenarios")
+SCENARIO_DEFAULT_PATH = os.path.join(SCENARIO_DIR, "default.json")
+
+
+class Scenario:
+    """Initial state of a simulation.
+
+    Attributes:
+        field_config (src.field.config.FieldConfig): Configuration of the
+            field.
+        field_seed (int): Seed value for terrain generation.
+        sim_seed (int): Seed value for the simulation.
+        groups (list[dict]): Initial groups. Each of them has `row`, `col`,
+            `popl`, `food` and `character`, and also occupies the neighbor
+            cells of the cell if `neighbors` is `True`.
+    """
+
+    def __init__(self, field_config=None, field_seed=9, sim_seed=1,
+                 groups=None):
+        """Initial state of a simulation.
+
+        Args:
+            field_config (src.field.config.FieldConfig | None): Configuration
+                of the field. If `None`, the default configuration is used.
+            field_seed (int): Seed value for terrain generation.
+            sim_seed (int): Seed value for the simulation.
+            groups (list[dict] | None): Initial groups.
+        """
+        self.field_config = (
+            FieldConfig() if field_config is None else field_config)
+        self.field_seed = field_seed
+        self.sim_seed = sim_seed
+        self.groups = [] if groups is None else groups
+
+    def create_field(self, cache=None):
+        """Creates the field and its terrain.
+
+        Args:
+            cache (src.field.cache.TerrainCache | None): Terrain cache.
+
+        Returns:
+            out (src.field.field.Field): Field.
+        """
+        field = Field(self.field_config)
+        generate_terrain_with_cache(field, self.field_seed, cache)
+        return field
+
+    def create_simulation(self, field, engine="group"):
+        """Places the initial groups on a field and seeds the simulation.
+
+        Args:
+            field (src.field.field.Field): Field created by `create_field()`.
+            engine (str): Engine that updates groups, one of
+                `src.civ.simulation.SIMULATION_ENGINES`.
+
+        Returns:
+            out (src.civ.simulation.Simulation): Simulation.
+        """
+        groups = []
+        for spec in self.groups:
+            cell = field.cells[spec["row"]][spec["col"]]
+            cells = [cell]
+            if spec.get("neighbors", False):
+                cells += cell.neighborhood
+            for c in cells:
+                groups.append(
+                    Group(spec["popl"], spec["food"], spec["character"], c))
+        Group.rng.seed(self.sim_seed)
+        return Simulation(field, groups, self.sim_seed, engine)
+
+
+def load_scenario(path=SCENARIO_DEFAULT_PATH):
+    """Loads a scenario from a JSON file.
+
+    Args:
+        path (str): Path to the scenario file.
+
+    Returns:
+        out (src.scenario.Scenario): Scenario.
+    """
+    with open(path, encoding="utf-8") as f:
+        params = json.load(f)
+    return Scenario(
+        field_config=FieldConfig(**params.get("field", {})),
+        field_seed=params.get("field_seed", 9),
+        sim_seed=params.get("sim_seed", 1),
+        groups=params.get("groups", []))
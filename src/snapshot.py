@@ -0,0 +1,237 @@
+"""Module for saving and loading the whole state of simulations.
+
+A snapshot file consists of the following parts:
+
+- Magic bytes `SNAPSHOT_MAGIC`.
+- Format version as a little-endian uint32.
+- Size of the header as a little-endian uint32.
+- Header as UTF-8 JSON. It holds the scalar state and the dtype, shape and
+  offset of every array.
+- Arrays stored uncompressed in C order, each aligned to
+  `SNAPSHOT_ALIGNMENT` bytes from the start of the file, so that they can
+  be memory-mapped.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from src.civ.group import (
+    Group,
+    reserve_group_ids,
+)
+from src.civ.simulation import Simulation
+from src.field.cell import Cell
+from src.field.config import FieldConfig
+from src.field.field import Field
+
+SNAPSHOT_MAGIC = b"NEKOSNAP"
+SNAPSHOT_VERSION = 3
+SNAPSHOT_ALIGNMENT = 64  # B
+
+SNAPSHOT_FIELD_ARRAYS = (
+    "elevs", "stpns", "surfaces", "labels", "label_sizes", "label_surfaces",
+    "label_bboxes", "land_dists", "nearest_lands", "group_ids")
+
+SNAPSHOT_GROUP_ARRAYS = {
+    "id": np.int64,
+    "popl": np.int64,
+    "food": np.int64,
+    "diff": np.float64,
+    "popl_decr": np.int64,
+    "popl_emig": np.int64,
+    "alive": bool,
+}
+
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def align(offset):
+    """Rounds an offset up to a multiple of `SNAPSHOT_ALIGNMENT`.
+
+    Args:
+        offset (int): Offset (B).
+
+    Returns:
+        out (int): Aligned offset (B).
+    """
+    return -(-offset//SNAPSHOT_ALIGNMENT)*SNAPSHOT_ALIGNMENT
+
+
+def collect_arrays(simulation, rng_state):
+    """Collects the arrays that make up the state of a simulation.
+
+    Args:
+        simulation (src.civ.simulation.Simulation): Simulation.
+        rng_state (dict[str, dict]): State of the random number generation
+            service.
+
+    Returns:
+        out (dict[str, numpy.ndarray]): Arrays keyed by their name.
+    """
+    arrays = {}
+    for name in SNAPSHOT_FIELD_ARRAYS:
+        arrays[f"field.{name}"] = getattr(simulation.field, name)
+
+    # Groups are stored in the order they act
+    groups = list(simulation.groups)
+    for name, dtype in SNAPSHOT_GROUP_ARRAYS.items():
+        arrays[f"groups.{name}"] = np.array(
+            [getattr(group, name) for group in groups], dtype=dtype)
+    arrays["groups.character"] = np.array(
+        [group.character for group in groups], dtype=np.float64).reshape(
+            len(groups), Group.N_DIM_CHARACTER)
+    arrays["groups.cell"] = np.array(
+        [group.cell.index for group in groups], dtype=np.int64)
+
+    for name, state in rng_state.items():
+        arrays[f"rng.{name}.buffer"] = state["buffer"]
+    return arrays
+
+
+def save_snapshot(path, simulation, rng=None):
+    """Saves the whole state of a simulation.
+
+    Args:
+        path (str): Path to the snapshot file.
+        simulation (src.civ.simulation.Simulation): Simulation to save.
+        rng (src.civ.rng.SimRandom | None): Random number generation
+            service. If `None`, the one shared by groups is used.
+    """
+    rng = Group.rng if rng is None else rng
+    rng_state = rng.get_state()
+    arrays = collect_arrays(simulation, rng_state)
+
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        entries[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset = align(offset + array.nbytes)
+    rng_states = {
+        name: {
+            "bit_generator": state["bit_generator"],
+            "position": state["position"],
+        }
+        for name, state in rng_state.items()}
+    header = {
+        "turn": simulation.turn,
+        "seed": simulation.seed,
+        "engine": simulation.engine,
+        "field": simulation.field.config.to_dict(),
+        "rng": rng_states,
+        "arrays": entries,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = align(_PREAMBLE.size + len(header_bytes))
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(memoryview(array.reshape(-1)).cast("B"))
+        f.truncate(data_start + offset)
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path):
+    """Reads the header and arrays of a snapshot file.
+
+    The file is memory-mapped in copy-on-write mode, so arrays are read
+    lazily and modifying them does not change the file.
+
+    Args:
+        path (str): Path to the snapshot file.
+
+    Returns:
+        out (tuple[dict, dict[str, numpy.ndarray]]): Header and arrays.
+    """
+    with open(path, "rb") as f:
+        magic, version, header_size = _PREAMBLE.unpack(
+            f.read(_PREAMBLE.size))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"not a snapshot file: {path}")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"unsupported snapshot version {version}: {path}")
+        header = json.loads(f.read(header_size).decode("utf-8"))
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    data_start = align(_PREAMBLE.size + header_size)
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=int(np.prod(shape)),
+            offset=data_start + entry["offset"]).reshape(shape)
+    return header, arrays
+
+
+def load_snapshot(path, rng=None, engine=None):
+    """Loads the whole state of a simulation.
+
+    Args:
+        path (str): Path to the snapshot file.
+        rng (src.civ.rng.SimRandom | None): Random number generation
+            service to restore the state of. If `None`, the one shared by
+            groups is used.
+        engine (str | None): Engine that updates groups, one of
+            `src.civ.simulation.SIMULATION_ENGINES`. If `None`, the engine
+            of the saved simulation is used.
+
+    Returns:
+        out (src.civ.simulation.Simulation): Simulation.
+    """
+    rng = Group.rng if rng is None else rng
+    header, arrays = read_snapshot(path)
+
+    field = Field(FieldConfig(**header["field"]))
+    for name in SNAPSHOT_FIELD_ARRAYS:
+        # Arrays of older snapshots may have other dtypes
+        setattr(field, name, arrays[f"field.{name}"].astype(
+            getattr(field, name).dtype, copy=False))
+
+    columns = {
+        name: arrays[f"groups.{name}"].tolist()
+        for name in SNAPSHOT_GROUP_ARRAYS}
+    characters = np.array(arrays["groups.character"])
+    cells = arrays["groups.cell"].tolist()
+    groups = []
+    for k in range(len(cells)):
+        group = Group.__new__(Group)
+        for name in SNAPSHOT_GROUP_ARRAYS:
+            setattr(group, name, columns[name][k])
+        group.character = characters[k]
+        row, col = divmod(cells[k], field.width)
+        group.cell = Cell(field, row, col)
+        field.groups[group.id] = group
+        groups.append(group)
+    if len(groups) > 0:
+        reserve_group_ids(max(columns["id"]) + 1)
+    field.dirty_cells.update(cells)
+
+    rng.set_state({
+        name: {
+            "bit_generator": state["bit_generator"],
+            "buffer": arrays[f"rng.{name}.buffer"],
+            "position": state["position"],
+        }
+        for name, state in header["rng"].items()})
+
+    if engine is None:
+        engine = header["engine"]
+    simulation = Simulation(field, groups, header["seed"], engine)
+    simulation.turn = header["turn"]
+    return simulation
@@ -0,0 +1,154 @@
+"""Module for timing the phases of loops, such as turns and frames."""
+
+import csv
+import os
+import threading
+import time
+
+import numpy as np
+
+TIMING_WINDOW = 240  # iterations
+
+TIMING_TURN_PHASES = (
+    "turn", "turn.sort", "group.mutate", "group.consume",
+    "group.emigrate", "group.cross_sea", "group.produce")
+
+TIMING_TURNS_CSV_NAME = "turns.csv"
+TIMING_FRAMES_CSV_NAME = "frames.csv"
+
+
+class PhaseTimer:
+    """Timer that collects the time spent in named phases of a loop.
+
+    Times are added to phases during an iteration of the loop, such as a
+    turn or a frame, and `commit()` ends the iteration. The totals of the
+    latest iterations are kept in a ring buffer for rolling statistics, and
+    can be streamed to a CSV file as well.
+
+    Code that is timed checks whether a timer is set before reading the
+    clock, so a disabled timer costs no more than that check.
+
+    Attributes:
+        phases (tuple[str, ...]): Names of the phases.
+        window (int): Number of the latest iterations that statistics are
+            calculated over.
+        totals (dict[str, float]): Time spent in each phase in the current
+            iteration (s).
+        samples (numpy.ndarray): Ring buffer of the totals of the latest
+            iterations shaped (window, n_phases) (s).
+        n_samples (int): Number of committed iterations.
+        csv_file (io.TextIOWrapper | None): File that the totals of every
+            iteration are written to.
+        lock (threading.Lock): Lock for the samples, since statistics can be
+            read from another thread.
+    """
+
+    def __init__(self, phases, window=TIMING_WINDOW, csv_path=None):
+        """Timer that collects the time spent in named phases of a loop.
+
+        Args:
+            phases (Iterable[str]): Names of the phases.
+            window (int): Number of the latest iterations that statistics
+                are calculated over.
+            csv_path (str | None): Path to a CSV file that the totals of
+                every iteration are written to. If `None`, they are not
+                written.
+        """
+        self.phases = tuple(phases)
+        self.window = window
+        self.totals = dict.fromkeys(self.phases, 0.0)
+        self.samples = np.zeros((window, len(self.phases)), dtype=np.float64)
+        self.n_samples = 0
+        self.lock = threading.Lock()
+        self._time_lap = time.perf_counter()
+
+        self.csv_file = None
+        self._csv_writer = None
+        if csv_path is not None:
+            directory = os.path.dirname(csv_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+            self._csv_writer = csv.writer(self.csv_file)
+            self._csv_writer.writerow(("iteration",) + self.phases)
+
+    def start(self):
+        """Starts timing laps from now."""
+        self._time_lap = time.perf_counter()
+
+    def lap(self, phase):
+        """Adds the time since the previous lap or `start()` to a phase.
+
+        Args:
+            phase (str): Name of the phase.
+        """
+        now = time.perf_counter()
+        self.totals[phase] += now - self._time_lap
+        self._time_lap = now
+
+    def add(self, phase, elapsed):
+        """Adds time to a phase in the current iteration.
+
+        Args:
+            phase (str): Name of the phase.
+            elapsed (float): Time spent in the phase (s).
+        """
+        self.totals[phase] += elapsed
+
+    def reset(self):
+        """Discards the times added in the current iteration."""
+        for phase in self.phases:
+            self.totals[phase] = 0.0
+
+    def commit(self):
+        """Ends the current iteration and records its totals."""
+        row = [self.totals[phase] for phase in self.phases]
+        self.reset()
+        with self.lock:
+            self.samples[self.n_samples % self.window] = row
+            self.n_samples += 1
+        if self._csv_writer is not None:
+            self._csv_writer.writerow([self.n_samples] + row)
+
+    def summarize(self):
+        """Calculates rolling statistics of the latest iterations.
+
+        Returns:
+            out (dict[str, tuple[float, float, float]]): Minimum, mean and
+                99th percentile time (s) of each phase. Empty if no
+                iterations have been committed.
+        """
+        with self.lock:
+            samples = self.samples[:min(self.n_samples, self.window)].copy()
+        if len(samples) == 0:
+            return {}
+        mins = samples.min(axis=0)
+        means = samples.mean(axis=0)
+        p99s = np.percentile(samples, 99, axis=0)
+        return {
+            phase: (mins[k], means[k], p99s[k])
+            for k, phase in enumerate(self.phases)}
+
+    def close(self):
+        """Closes the CSV file if there is one."""
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+            self._csv_writer = None
+
+
+def format_phase_stats(stats):
+    """Formats rolling statistics of phases as lines.
+
+    Args:
+        stats (dict[str, tuple[float, float, float]]): Statistics returned
+            by `src.timing.PhaseTimer.summarize()`.
+
+    Returns:
+        out (list[str]): Line of every phase with times in milliseconds.
+    """
+    width = max((len(phase) for phase in stats), default=0)
+    return [
+        f"{phase:<{width}}  min {1000*t_min:7.3f}  mean {1000*t_mean:7.3f}  "
+        f"p99 {1000*t_p99:7.3f} ms"
+        for phase, (t_min, t_mean, t_p99) in stats.items()]
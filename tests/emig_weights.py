@@ -0,0 +1,81 @@
+import numpy as np
+
+from src.civ.group import (
+    Group,
+    calc_emig_dest_weights,
+    sample_emig_dests,
+)
+from src.civ.rng import SimRandom
+from src.field.cell import Cell
+from src.scenario import load_scenario
+
+N_TURN = 400
+N_SAMPLE = 200_000
+SAMPLE_TOLERANCE = 0.01
+
+
+def record_weights(group):
+    """Returns the weights that `select_dest_for_emig()` chooses with."""
+    stream = Group.rng.emigration
+    recorded = []
+    choice_index = stream.choice_index
+    stream.choice_index = lambda weights: recorded.append(weights) or 0
+    try:
+        group.select_dest_for_emig()
+    finally:
+        stream.choice_index = choice_index
+    return recorded[0]
+
+
+if __name__ == "__main__":
+    scenario = load_scenario()
+    field = scenario.create_field()
+    simulation = scenario.create_simulation(field)
+    for _ in range(N_TURN):
+        simulation.step()
+    groups = simulation.groups
+
+    def calc_occupant_weights(group_ids):
+        return np.array([
+            field.groups[group_id].food/(
+                field.groups[group_id].diff*field.groups[group_id].popl)
+            for group_id in group_ids])
+
+    cells = np.array([group.cell.index for group in groups], dtype=np.intp)
+    neighbor_indices, weights = calc_emig_dest_weights(
+        field, cells, field.group_ids, calc_occupant_weights)
+    neighbor_mask = field.neighbor_mask.reshape(-1, 6)[cells]
+
+    # Batch weights equal the ones of groups one by one
+    for k, group in enumerate(groups):
+        assert weights[k][neighbor_mask[k]].tolist() == record_weights(group)
+        assert neighbor_indices[k][neighbor_mask[k]].tolist() == [
+            cell.index for cell in group.cell.neighborhood]
+    print(f"weights of {len(groups)} groups are equal")
+
+    # Empty flat cells get finite weights
+    group = groups[0]
+    flat = [
+        cell for cell in group.cell.neighborhood
+        if cell.surface == Cell.SURFACE_LAND and cell.group is None]
+    assert len(flat) > 0
+    for cell in flat:
+        cell.stpn = 0.0
+    _, flat_weights = calc_emig_dest_weights(
+        field, cells[:1], field.group_ids, calc_occupant_weights)
+    assert np.isfinite(flat_weights).all()
+    assert flat_weights[0][neighbor_mask[0]].tolist() == record_weights(group)
+    print(f"weights of {len(flat)} flat cells are finite")
+
+    # Sampled destinations follow the weights
+    k = int(np.argmax(np.count_nonzero(weights > 0, axis=-1)))
+    dests = sample_emig_dests(
+        np.repeat(neighbor_indices[k:k + 1], N_SAMPLE, axis=0),
+        np.repeat(weights[k:k + 1], N_SAMPLE, axis=0),
+        SimRandom(1).emigration)
+    probs = weights[k]/weights[k].sum()
+    freqs = np.array([
+        np.count_nonzero(dests == index) for index in neighbor_indices[k]]
+    )/N_SAMPLE
+    assert np.abs(freqs - probs).max() < SAMPLE_TOLERANCE, (probs, freqs)
+    print(f"sampled frequencies {freqs.round(3)} match {probs.round(3)}")
@@ -0,0 +1,44 @@
+import time
+import tracemalloc
+
+from src.field.config import FieldConfig
+from src.field.field import Field
+
+SCALES = (32, 128)
+N_REPEAT = 3
+MEMORY_PER_CELL_MAX = 66  # B
+MEMORY_TOLERANCE = 0.05
+TIME_TOLERANCE = 2
+
+
+def measure(config):
+    """Returns the memory (B) and minimum time (s) to create a field."""
+    tracemalloc.start()
+    field = Field(config)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del field
+
+    times = []
+    for _ in range(N_REPEAT):
+        time_start = time.perf_counter()
+        Field(config)
+        times.append(time.perf_counter() - time_start)
+    return memory, min(times)
+
+
+if __name__ == "__main__":
+    per_cell = []
+    for scale in SCALES:
+        config = FieldConfig(scale=scale)
+        memory, time_min = measure(config)
+        n_cells = config.width*config.height
+        per_cell.append((memory/n_cells, time_min/n_cells))
+        print(f"scale={scale}: {memory/n_cells:.1f} B/cell, "
+              f"{1e9*time_min/n_cells:.1f} ns/cell")
+
+    # Memory and time per cell stay flat as fields grow
+    (memory_small, time_small), (memory_large, time_large) = per_cell
+    assert memory_large <= MEMORY_PER_CELL_MAX, memory_large
+    assert abs(memory_large/memory_small - 1) < MEMORY_TOLERANCE
+    assert time_large/time_small < TIME_TOLERANCE
@@ -0,0 +1,72 @@
+import numpy as np
+
+from src.field.config import FieldConfig
+from src.field.field import Field
+from src.field.terrain import generate_terrain
+
+CASES = (
+    (FieldConfig(scale=4, base_width=2, base_height=2), 5),
+    (FieldConfig(scale=8, base_width=6, base_height=3), 3),
+    (FieldConfig(), 9),
+)
+
+
+def flood_fill(field):
+    """Labels components one by one in the order of their first cell."""
+    surfaces = field.surfaces.ravel()
+    neighbors = field.neighbor_indices.reshape(-1, 6)
+    neighbor_mask = field.neighbor_mask.reshape(-1, 6)
+    labels = np.full(field.n_cells, -1)
+    n_labels = 0
+    for start in range(field.n_cells):
+        if labels[start] >= 0:
+            continue
+        labels[start] = n_labels
+        stack = [start]
+        while stack:
+            index = stack.pop()
+            for neighbor in neighbors[index][neighbor_mask[index]].tolist():
+                if (labels[neighbor] < 0
+                        and surfaces[neighbor] == surfaces[index]):
+                    labels[neighbor] = n_labels
+                    stack.append(neighbor)
+        n_labels += 1
+    return labels
+
+
+def calc_arc_width(occupied):
+    """Returns the width of the narrowest wrapping arc over columns."""
+    if occupied.all():
+        return len(occupied)
+    # Longest run of unoccupied columns around the wrap
+    gaps = np.concatenate([~occupied, ~occupied]).astype(np.int64)
+    longest = run = 0
+    for gap in gaps.tolist():
+        run = run + 1 if gap else 0
+        longest = max(longest, run)
+    return len(occupied) - min(longest, len(occupied))
+
+
+if __name__ == "__main__":
+    for config, seed in CASES:
+        field = Field(config)
+        generate_terrain(field, seed, compat=False)
+        width = field.width
+        labels = flood_fill(field)
+        n_labels = labels.max() + 1
+
+        assert (labels == field.labels.ravel()).all()
+        assert (np.bincount(labels) == field.label_sizes).all()
+        for label in range(n_labels):
+            cells = np.flatnonzero(labels == label)
+            rows, cols = cells//width, cells % width
+            assert field.label_surfaces[label] == field.surfaces.flat[cells[0]]
+
+            row_min, col_min, row_max, col_max = field.label_bboxes[label]
+            assert (row_min, row_max) == (rows.min(), rows.max())
+            occupied = np.zeros(width, dtype=bool)
+            occupied[cols] = True
+            assert col_max - col_min + 1 == calc_arc_width(occupied)
+            in_box = (cols - col_min) % width <= col_max - col_min
+            assert in_box.all()
+        print(f"{config.to_dict()}: {n_labels} components match")
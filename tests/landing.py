@@ -0,0 +1,52 @@
+import numpy as np
+
+from src.civ.group import (
+    Group,
+    find_landing_cell,
+)
+from src.civ.rng import SimRandom
+from src.field.cell import Cell
+from src.field.field import Field
+
+N_CROSSING = 500
+
+# Two strips of land separated by a narrow strait, set by hand without
+# generating terrain, so distances to land are unknown
+ROWS = range(100, 160)
+DEPARTURE_COL = 200
+ARRIVAL_COL = 203
+
+
+if __name__ == "__main__":
+    field = Field()
+    for row in ROWS:
+        for col in (DEPARTURE_COL, ARRIVAL_COL):
+            cell = field.cells[row][col]
+            cell.surface = Cell.SURFACE_LAND
+            cell.stpn = 0.001
+    assert (field.land_dists < 0).all()
+
+    departure = field.cells[130][DEPARTURE_COL]
+    stream = SimRandom(1).crossing
+    landings = [
+        find_landing_cell(departure, stream) for _ in range(N_CROSSING)]
+    landed = [cell for cell in landings if cell is not None]
+    assert len(landed) > 0, "no crossing landed"
+    assert all(cell.surface == Cell.SURFACE_LAND for cell in landed)
+    cols = np.array([cell.col for cell in landed])
+    assert np.isin(cols, (DEPARTURE_COL, ARRIVAL_COL)).all()
+    print(f"{len(landed)} of {N_CROSSING} crossings landed, "
+          f"{np.count_nonzero(cols == ARRIVAL_COL)} across the strait")
+
+    # Emigrants found a group where they land
+    Group.rng.seed(1)
+    group = Group(10, 20, [0.5, 0.5, 0.5], departure)
+    group.popl_emig = 5
+    sea = field.cells[130][DEPARTURE_COL + 1]
+    for _ in range(N_CROSSING):
+        new_group = group.cross_sea(sea)
+        if new_group is not None:
+            break
+    assert new_group is not None and new_group.cell.group is new_group
+    print(f"a group was founded on ({new_group.cell.row}, "
+          f"{new_group.cell.col})")
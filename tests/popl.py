@@ -1,30 +1,32 @@
-import random
-
 import matplotlib.pyplot as plt
 
 from src.civ.group import Group
 from src.field.cell import Cell
+from src.field.field import Field
 
 N_TURN = 1000
 
 
 if __name__ == "__main__":
     # Players
-    c1 = Cell(0, 0)
+    field = Field()
+
+    c1 = field.cells[0][0]
     c1.stpn = 0.0007
     c1.surface = Cell.SURFACE_LAND
 
-    c2 = Cell(0, 1)
+    c2 = field.cells[0][1]
     c2.stpn = 0.0005
     c2.surface = Cell.SURFACE_LAND
 
-    c3 = Cell(1, 0)
+    c3 = field.cells[1][0]
     c3.stpn = 0.0001
     c3.surface = Cell.SURFACE_LAND
 
     c1.neighborhood = [c2, c3]
     c2.neighborhood = [c3, c1]
     c3.neighborhood = [c1, c2]
+    assert field.cells[0][0].neighborhood == [c2, c3]
 
     Group(10, 20, [0.5, 0.5, 0.5], c1)
     Group(10, 20, [0.5, 0.5, 0.5], c2)
@@ -32,7 +34,7 @@ if __name__ == "__main__":
 
     # Simulation
     sim_seed = 1
-    random.seed(sim_seed)
+    Group.rng.seed(sim_seed)
 
     xs = []
     popls = []
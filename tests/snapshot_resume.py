@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+from src.civ.simulation import SIMULATION_ENGINES
+from src.scenario import load_scenario
+from src.snapshot import (
+    load_snapshot,
+    save_snapshot,
+)
+
+N_TURN = 200
+
+
+def get_state(simulation):
+    """Returns the state of groups in the order they act.
+
+    IDs are left out, since groups founded after loading get other IDs in
+    the same process.
+    """
+    return [
+        (group.popl, group.food, group.diff, group.cell.index,
+         tuple(group.character))
+        for group in simulation.groups]
+
+
+if __name__ == "__main__":
+    scenario = load_scenario()
+    for engine in SIMULATION_ENGINES:
+        field = scenario.create_field()
+        simulation = scenario.create_simulation(field, engine)
+        for _ in range(N_TURN):
+            simulation.step()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "snapshot.bin")
+            save_snapshot(path, simulation)
+            for _ in range(N_TURN):
+                simulation.step()
+            resumed = load_snapshot(path)
+
+        assert resumed.turn == N_TURN
+        assert resumed.seed == simulation.seed
+        assert resumed.engine == engine
+        for _ in range(N_TURN):
+            resumed.step()
+        assert get_state(resumed) == get_state(simulation)
+        assert resumed.summarize() == simulation.summarize()
+        print(f"{engine}: resumed run is identical at turn {resumed.turn}")
@@ -0,0 +1,45 @@
+import hashlib
+
+import numpy as np
+
+from src.field.field import Field
+from src.field.terrain import generate_terrain
+
+# SHA-256 of the terrain generated by the former cell-by-cell
+# implementation, with elevations and steepness as float64 and surfaces as
+# int8 in row-major order
+EXPECTED_HASHES = {
+    3: {
+        "elevs": "dd976598c64cae841cacea529c8d1840"
+                 "06c3c969bc0820d35649794326fe2969",
+        "stpns": "80977305057ecf1c89c579f7a45d35cc"
+                 "62adff1bf539f9fb21f8e4e24caa4ba0",
+        "surfaces": "0a30437eb93f1986017b34e4b11aef1e"
+                    "5693b3884ced8c656d229948a26f6927",
+    },
+    9: {
+        "elevs": "815db5806844c2edc9d4a6fe71982643"
+                 "56a172bf3f4632426834038f56c36178",
+        "stpns": "26cddc5c12779bb5c6099afb6b09c47b"
+                 "bd5877907d149695478a52d052867614",
+        "surfaces": "7f70a797af5266ed3de0294f7ffda44c"
+                    "e8a25e361dfbdad1d9dc1a5e92720e80",
+    },
+}
+
+DTYPES = {"elevs": np.float64, "stpns": np.float64, "surfaces": np.int8}
+
+
+def hash_array(array, dtype):
+    array = np.ascontiguousarray(array, dtype=dtype)
+    return hashlib.sha256(array.tobytes()).hexdigest()
+
+
+if __name__ == "__main__":
+    for seed, hashes in EXPECTED_HASHES.items():
+        field = Field()
+        generate_terrain(field, seed, compat=True)
+        for name, expected in hashes.items():
+            actual = hash_array(getattr(field, name), DTYPES[name])
+            assert actual == expected, f"{name} differs for seed {seed}"
+        print(f"seed {seed}: identical to the former implementation")